@@ -0,0 +1,51 @@
+#Import time budget check for the thermistor modules
+#Runs a cold 'python -X importtime' import of a module in a fresh interpreter,
+#prints the cumulative import time and exits non zero if it is over budget
+#or if the import pulled in a heavy dependency (numpy, scipy).
+#Usage: python bench_import.py [--budget ms] [--runs n] [--dir path] [module]
+
+import argparse
+import os
+import subprocess
+import sys
+
+HEAVY = ('numpy', 'scipy')
+
+
+def import_times(module, cwd):
+    """Returns {module name: cumulative import time in us} for one cold import"""
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import '+module],
+                         cwd=cwd, stderr=subprocess.PIPE, universal_newlines=True, check=True).stderr
+
+    times = {}
+    for line in out.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='cold import time budget check')
+    parser.add_argument('module', nargs='?', default='ntc_model')
+    parser.add_argument('--budget', type=float, default=30.0, help='budget in ms, default 30')
+    parser.add_argument('--runs', type=int, default=5, help='best of n runs, default 5')
+    parser.add_argument('--dir', default=os.path.dirname(os.path.abspath(__file__)),
+                        help='directory to import from, default the repository root')
+    args = parser.parse_args()
+
+    best = None
+    for i in range(args.runs):
+        times = import_times(args.module, args.dir)
+        heavy = set(name.split('.')[0] for name in times) & set(HEAVY)
+        if heavy:
+            print('FAIL: importing {} pulled in {}'.format(args.module, ', '.join(sorted(heavy))))
+            sys.exit(1)
+        t = times[args.module]/1000.0
+        best = t if best is None else min(best, t)
+
+    print('{}: cold import {:.2f} ms (budget {:.2f} ms, best of {})'.format(args.module, best, args.budget, args.runs))
+    if best > args.budget:
+        print('FAIL: over budget')
+        sys.exit(1)
@@ -0,0 +1,109 @@
+#Correctness check of the native cubic spline tables against scipy
+#Compares the 'spline' backend with scipy.interpolate.interp1d(kind='cubic')
+#in both directions (R->T and T->R) on a dense grid, then checks the
+#T->R->T and R->T->R round trip tolerances of each table. Where the R->T
+#spline of a table turns or leaves the table's temperatures the two
+#directions cannot agree; from the table point before that on the round
+#trips are only reported, as the tail.
+#Python 2 checks both NTC_interp2 tables (B3435, OZ1LQO); Python 3 checks
+#the measured table of NTC_py3. Skips (exit 0) when scipy is not installed.
+#Usage: python check_interp.py [--points n]
+
+import argparse
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# largest allowed |spline - scipy|, K or kOhm
+MATCH = 1e-9
+
+# round trip limits per table: (T->R->T in K, R->T->R relative).
+# B3435, a manufacturer table to 5 digits: 0.05 K, a tenth of the +-0.5 K of
+# the part, and 0.3 %, what 0.05 K is in resistance at -40 C.
+# OZ1LQO, hand measured in whole kelvin to 2-3 digit resistances: 1 K, its
+# temperature resolution, and 4 %, 1 K in resistance at 25 C.
+ROUND_TRIP = {'B3435': (0.05, 0.003), 'OZ1LQO': (1.0, 0.04)}
+
+
+def tables():
+    """Returns [(name, (RtoT, TtoR) spline, (RtoT, TtoR) scipy, table resistances ascending)]"""
+    if sys.version_info[0] == 2:
+        sys.path.insert(0, os.path.join(HERE, 'py2'))
+        import NTC_interp2
+        found = []
+        for name in ('B3435', 'OZ1LQO'):
+            res, temp = NTC_interp2.load_table(name)
+            found.append((name, NTC_interp2.interpolators(name, 'spline'), NTC_interp2.interpolators(name, 'scipy'), res))
+        return found
+
+    sys.path.insert(0, os.path.join(HERE, 'py3'))
+    import NTC_py3
+    pairs = {}
+    for backend in ('spline', 'scipy'):
+        NTC_py3.interp_backend = backend
+        pairs[backend] = NTC_py3.meas_interpolators()
+    NTC_py3.interp_backend = 'spline'
+    return [('OZ1LQO', pairs['spline'], pairs['scipy'], sorted(NTC_py3.meas_res))]
+
+
+def grid(lo, hi, n):
+    return [lo + (hi-lo)*i/(n-1.0) for i in range(n)]
+
+
+def tail_start(RtoT, res, points):
+    """Returns the table resistance before which R->T falls monotonically
+    and stays within the table's temperatures (the last one if it always does)"""
+    t_lo, t_hi = RtoT(res[-1]), RtoT(res[0])
+    r = grid(res[0], res[-1], points)
+    T = [RtoT(x) for x in r]
+    for x, a, b in zip(r[1:], T, T[1:]):
+        if not (t_lo <= b < a <= t_hi or b == t_lo):
+            return max(p for p in res if p < x)
+    return res[-1]
+
+
+def round_trips(RtoT, TtoR, r_lo, r_hi, t_table, points):
+    """Returns the worst T->R->T (K) and R->T->R (relative) round trips for
+    resistances r_lo..r_hi, kept inside the table where the inner result
+    leaves it"""
+    (t_lo, t_hi), (res_lo, res_hi) = t_table, (TtoR(t_table[1]), TtoR(t_table[0]))
+    trip_t = max(abs(RtoT(min(max(TtoR(t), res_lo), res_hi)) - t) for t in grid(RtoT(r_hi), RtoT(r_lo), points))
+    trip_r = max(abs(TtoR(min(max(RtoT(r), t_lo), t_hi)) - r)/r for r in grid(r_lo, r_hi, points))
+    return trip_t, trip_r
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='native spline vs scipy interp1d check')
+    parser.add_argument('--points', type=int, default=2001, help='grid points per direction, default 2001')
+    args = parser.parse_args()
+
+    try:
+        import scipy
+    except ImportError:
+        print('SKIP: scipy is not installed')
+        sys.exit(0)
+
+    failed = False
+    for name, (RtoT, TtoR), (RtoT_sp, TtoR_sp), res in tables():
+        r_lo, r_hi = res[0], res[-1]
+        t_table = (RtoT(r_hi), RtoT(r_lo))
+
+        d_rt = max(abs(RtoT(r) - float(RtoT_sp(r))) for r in grid(r_lo, r_hi, args.points))
+        d_tr = max(abs(TtoR(t) - float(TtoR_sp(t))) for t in grid(t_table[0], t_table[1], args.points))
+
+        r_tail = tail_start(RtoT, res, args.points)
+        trip_t, trip_r = round_trips(RtoT, TtoR, r_lo, r_tail, t_table, args.points)
+
+        lim_t, lim_r = ROUND_TRIP[name]
+        ok = d_rt <= MATCH and d_tr <= MATCH and trip_t <= lim_t and trip_r <= lim_r
+        failed |= not ok
+        print('{}: R->T vs scipy {:.1e} K, T->R vs scipy {:.1e} kOhm, round trip to {}k T {:.3f} K (<= {}), R {:.3%} (<= {:.1%}) {}'
+              .format(name, d_rt, d_tr, r_tail, trip_t, lim_t, trip_r, lim_r, 'ok' if ok else 'FAIL'))
+        if r_tail < r_hi:
+            tail_t, tail_r = round_trips(RtoT, TtoR, r_tail, r_hi, t_table, args.points)
+            print('  tail {}k..{}k, R->T turns or leaves the table: round trip T {:.3f} K, R {:.3%}, not checked'
+                  .format(r_tail, r_hi, tail_t, tail_r))
+
+    if failed:
+        sys.exit(1)
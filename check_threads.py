@@ -0,0 +1,132 @@
+#Concurrent stress check for the thermister conversion methods
+#Many threads share one instance of each thermister class and convert
+#shuffled inputs; every result must be bit-identical to a single threaded
+#reference. Exits non zero on any mismatch or exception. Runs on Python 2
+#and 3, and checks the interpolating modules of the running Python version.
+#A Circuit with a small from_volts cache is stressed too, its hit and miss
+#counts must add up and it must never exceed its size.
+#Usage: python check_threads.py [--threads n] [--passes n] [--points n]
+
+import argparse
+import os
+import random
+import sys
+import threading
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def subjects():
+    """Returns [(name, function of one value, inputs)] to stress"""
+    sys.path.insert(0, HERE)
+    from ntc_model import Model, SteinhartHart, Circuit
+
+    model = Model(3435, 10, 298)
+    sh = SteinhartHart.fit([190.953, 42.636, 10.0, 3.0197, 0.85833], [233.0, 263.0, 298.0, 333.0, 378.0])
+    circuit = Circuit(model, 3.3, 10, 10)
+
+    res = [0.5 + 0.01*i for i in range(2000)]
+    temp = [240 + 0.07*i for i in range(2000)]
+    volts = [0.2 + 0.0007*i for i in range(2000)]
+    items = [('Model.RtoT', model.RtoT, res), ('Model.TtoR', model.TtoR, temp),
+             ('SteinhartHart.RtoT', sh.RtoT, res), ('SteinhartHart.TtoR', sh.TtoR, temp),
+             ('Circuit.from_volts', circuit.from_volts, volts)]
+
+    if sys.version_info[0] == 2:
+        sys.path.insert(0, os.path.join(HERE, 'py2'))
+        from NTC_interp2 import Ntc
+        import NTC_model2
+        table = Ntc('B3435')
+        model2 = NTC_model2.Ntc(3435, 10, 298)
+        items += [('NTC_interp2.Ntc.RtoT', table.RtoT, [0.9 + 0.09*i for i in range(2000)]),
+                  ('NTC_interp2.Ntc.TtoR', table.TtoR, [274 + 0.05*i for i in range(2000)]),
+                  ('NTC_model2.Ntc.RtoT', model2.RtoT, res), ('NTC_model2.Ntc.TtoR', model2.TtoR, temp)]
+    else:
+        sys.path.insert(0, os.path.join(HERE, 'py3'))
+        from NTC_py3 import Ntc
+        ntc = Ntc(3435, 10, 298)
+        meas_res = [0.95 + 0.012*i for i in range(2000)]
+        meas_temp = [275 + 0.045*i for i in range(2000)]
+        items += [('NTC_py3.Ntc.RtoT_meas', ntc.RtoT_meas, meas_res), ('NTC_py3.Ntc.TtoR_meas', ntc.TtoR_meas, meas_temp),
+                  ('NTC_py3.Ntc.RtoT_calc', ntc.RtoT_calc, res), ('NTC_py3.Ntc.TtoR_calc', ntc.TtoR_calc, temp)]
+    return items
+
+
+def stress(func, inputs, threads, passes):
+    """Returns the number of results that differ from the serial reference"""
+    reference = dict((x, func(x)) for x in inputs)
+    bad = [0]
+    lock = threading.Lock()
+    start = threading.Event()
+
+    def worker(seed):
+        order = list(inputs)
+        shuffle = random.Random(seed).shuffle
+        start.wait()
+        for i in range(passes):
+            shuffle(order)
+            wrong = 0
+            for x in order:
+                try:
+                    wrong += func(x) != reference[x]
+                except Exception:
+                    wrong += 1
+            if wrong:
+                with lock:
+                    bad[0] += wrong
+
+    pool = [threading.Thread(target=worker, args=(seed,)) for seed in range(threads)]
+    for t in pool:
+        t.start()
+    start.set()
+    for t in pool:
+        t.join()
+    return bad[0]
+
+
+def stress_cache(threads, passes, points, size=2):
+    """Returns the mismatches of a cached Circuit plus 1 if its cache_info
+    does not add up after the run"""
+    sys.path.insert(0, HERE)
+    from ntc_model import Model, Circuit
+
+    circuit = Circuit(Model(3435, 10, 298), 3.3, 10, 10)
+    circuit.enable_cache(size)
+    #few distinct readings, as from a quantized ADC, so hits and evictions mix
+    volts = [0.5 + 0.1*(i % 8) for i in range(points)]
+    bad = stress(circuit.from_volts, volts, threads, passes)
+
+    hits, misses, used, limit = circuit.cache_info
+    calls = len(volts) * (1 + threads*passes)
+    if hits + misses != calls or used > limit:
+        print('Circuit cache: {} hits + {} misses of {} calls, {} of {} entries'.format(hits, misses, calls, used, limit))
+        bad += 1
+    return bad
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='concurrent determinism check of the conversions')
+    parser.add_argument('--threads', type=int, default=16, help='threads per instance, default 16')
+    parser.add_argument('--passes', type=int, default=8, help='shuffled passes per thread, default 8')
+    parser.add_argument('--points', type=int, default=2000, help='inputs per conversion, default 2000')
+    args = parser.parse_args()
+
+    #allow frequent thread switches so interleavings actually happen
+    if hasattr(sys, 'setswitchinterval'):
+        sys.setswitchinterval(1e-6)
+    else:
+        sys.setcheckinterval(1)
+
+    failed = 0
+    for name, func, inputs in subjects():
+        bad = stress(func, inputs[:args.points], args.threads, args.passes)
+        print('{}: {} threads x {} passes x {} inputs, {} mismatches'.format(
+            name, args.threads, args.passes, len(inputs[:args.points]), bad))
+        failed += bad
+    bad = stress_cache(args.threads, args.passes, args.points)
+    print('Circuit.from_volts cached: {} threads x {} passes x {} inputs, {} mismatches'.format(
+        args.threads, args.passes, args.points, bad))
+    failed += bad
+    if failed:
+        print('FAIL')
+        sys.exit(1)
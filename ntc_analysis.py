@@ -0,0 +1,211 @@
+#Design analysis for NTC Thermistor circuits built with ntc_model
+#Fell free to modify, improve, hack!
+#Everything here is vectorized with numpy over whole grids at once.
+#All temperatures are in degrees Kelvin and all resistance values are in kilo ohms
+
+import collections
+
+import numpy as np
+
+from ntc_model import Model
+
+#standard resistor values per decade, IEC 60063
+E24 = (1.0, 1.1, 1.2, 1.3, 1.5, 1.6, 1.8, 2.0, 2.2, 2.4, 2.7, 3.0,
+       3.3, 3.6, 3.9, 4.3, 4.7, 5.1, 5.6, 6.2, 6.8, 7.5, 8.2, 9.1)
+
+E96 = (1.00, 1.02, 1.05, 1.07, 1.10, 1.13, 1.15, 1.18, 1.21, 1.24, 1.27, 1.30,
+       1.33, 1.37, 1.40, 1.43, 1.47, 1.50, 1.54, 1.58, 1.62, 1.65, 1.69, 1.74,
+       1.78, 1.82, 1.87, 1.91, 1.96, 2.00, 2.05, 2.10, 2.15, 2.21, 2.26, 2.32,
+       2.37, 2.43, 2.49, 2.55, 2.61, 2.67, 2.74, 2.80, 2.87, 2.94, 3.01, 3.09,
+       3.16, 3.24, 3.32, 3.40, 3.48, 3.57, 3.65, 3.74, 3.83, 3.92, 4.02, 4.12,
+       4.22, 4.32, 4.42, 4.53, 4.64, 4.75, 4.87, 4.99, 5.11, 5.23, 5.36, 5.49,
+       5.62, 5.76, 5.90, 6.04, 6.19, 6.34, 6.49, 6.65, 6.81, 6.98, 7.15, 7.32,
+       7.50, 7.68, 7.87, 8.06, 8.25, 8.45, 8.66, 8.87, 9.09, 9.31, 9.53, 9.76)
+
+SERIES = {'E24': E24, 'E96': E96}
+
+#Result of rlin_sweep, arrays of the broadcast window shape:
+#optimal linearization resistor and its worst case linearity error (K),
+#nearest standard value and its worst case linearity error (K)
+RlinSweep = collections.namedtuple('RlinSweep', 'rlin error snapped snapped_error')
+
+
+def snap(values, series='E96'):
+    """Returns the nearest standard resistor values, nearest on a log scale.
+       1) values, array of resistances
+       2) series, 'E24', 'E96' or a sequence of per decade values in [1, 10)"""
+    if isinstance(series, str):
+        if series not in SERIES:
+            raise ValueError('unknown series {}, expected one of {}'.format(series, ', '.join(sorted(SERIES))))
+        series = SERIES[series]
+    base = np.log10(tuple(series) + (10.0,))
+
+    values = np.asarray(values, dtype=float)
+    decade = np.floor(np.log10(values))
+    mantissa = np.log10(values) - decade
+
+    #nearest of the two neighbouring series values
+    i = np.clip(np.searchsorted(base, mantissa), 1, len(base)-1)
+    lo, hi = base[i-1], base[i]
+    pick = np.where(mantissa-lo <= hi-mantissa, lo, hi)
+    return 10**(decade+pick)
+
+
+def linearity_error(ntc, rlin, T_hi, T_lo, points=65):
+    """Returns the worst case linearity error in K of the thermister in
+       parallel with rlin over each window: the largest deviation of the
+       parallel resistance from the straight line through its end points,
+       divided by that line's slope. All arguments broadcast.
+       ntc needs TtoR_array."""
+    rlin, T_hi, T_lo = np.broadcast_arrays(*[np.asarray(a, dtype=float) for a in (rlin, T_hi, T_lo)])
+
+    u = np.linspace(0.0, 1.0, points)
+    T = T_lo[..., None] + (T_hi-T_lo)[..., None]*u
+    R = ntc.TtoR_array(T)
+    rl = rlin[..., None]
+    Rp = R*rl/(R+rl)
+
+    span = Rp[..., -1:] - Rp[..., :1]
+    line = Rp[..., :1] + span*u
+    return np.abs(Rp-line).max(axis=-1) / np.abs(span[..., 0]) * np.abs(T_hi-T_lo)
+
+
+def rlin_sweep(ntc, T_hi, T_lo, series='E96', points=65):
+    """Sweeps the optimal linearization resistor over temperature windows.
+       1) ntc, closed form model with TtoR_array (Model, SteinhartHart)
+       2) T_hi, T_lo, window limits, broadcast against each other so
+          T_hi[:, None], T_lo[None, :] sweeps a full grid
+       3) series, standard values to snap to, see snap()
+       4) points, samples per window for the linearity error
+       Returns an RlinSweep of arrays in the broadcast window shape."""
+    rlin = ntc.Rlin_array(T_hi, T_lo)
+    snapped = snap(rlin, series)
+    return RlinSweep(rlin, linearity_error(ntc, rlin, T_hi, T_lo, points),
+                     snapped, linearity_error(ntc, snapped, T_hi, T_lo, points))
+
+
+#Result of analyze, arrays over the temperature grid (last axis):
+#T (K), ADC voltage V(T), sensitivity dV/dT (V/K), deviation from the least
+#squares line through V(T) expressed in K, temperature step of one ADC LSB (K),
+#None without bits
+Analysis = collections.namedtuple('Analysis', 'T volts dvdt deviation resolution')
+
+
+def analyze(circuit, T_lo, T_hi, points=100001, bits=None, vfs=None, rs=None, rlin=None):
+    """Linearity and sensitivity of a Circuit over a temperature range.
+       1) circuit, ntc_model.Circuit with a closed form ntc (steinhart_hart)
+       2) T_lo, T_hi, temperature range
+       3) points, size of the temperature grid
+       4) bits, ADC resolution for the per LSB resolution
+       5) vfs, ADC full scale voltage, defaults to circuit.vref
+       6) rs, rlin, optional arrays replacing the circuit's resistors; they
+          broadcast against each other and become the leading axes, so
+          rs[:, None], rlin[None, :] analyzes a full grid of divider designs
+       Returns an Analysis. The worst case figures are reductions over the
+       last axis, e.g. abs(a.deviation).max(-1)."""
+    a, b, c = circuit.ntc.steinhart_hart
+    rs = np.asarray(circuit.rs if rs is None else rs, dtype=float)[..., None]
+    rl = np.asarray(circuit.rlin if rlin is None else rlin, dtype=float)[..., None]
+    vref = float(circuit.vref)
+
+    T = np.linspace(T_lo, T_hi, points)
+    R = circuit.ntc.TtoR_array(T)
+    Rp = R*rl/(R+rl)
+    volts = vref*Rp/(rs+Rp)
+
+    #chain rule: 1/T = a + b lnR + c lnR^3, Rp = R||rl, V = vref Rp/(rs+Rp)
+    lnR = np.log(R)
+    dRdT = -R/(T*T*(b + 3*c*lnR*lnR))
+    dRpdR = (rl/(R+rl))**2
+    dVdRp = vref*rs/(rs+Rp)**2
+    dvdt = dVdRp*dRpdR*dRdT
+
+    #least squares line over the grid, deviation scaled to K by its slope
+    t = T - T.mean()
+    v = volts - volts.mean(axis=-1, keepdims=True)
+    slope = (v*t).sum(axis=-1, keepdims=True) / (t*t).sum()
+    deviation = (v - slope*t)/slope
+
+    resolution = None
+    if bits is not None:
+        lsb = (circuit.vref if vfs is None else vfs) / float(1 << bits)
+        resolution = lsb/np.abs(dvdt)
+
+    return Analysis(T, volts, dvdt, deviation, resolution)
+
+
+#Result of tolerance, over the temperature grid (last axis):
+#T (K), the percentiles asked for, error percentiles (K, measured - true)
+#with one row per percentile, worst absolute error seen (K)
+Tolerance = collections.namedtuple('Tolerance', 'T percentiles error worst')
+
+TOLERANCES = {'rs': 0.01, 'rlin': 0.01, 'vref': 0.005, 'B': 0.01, 'Rn': 0.01}
+
+
+def _tolerance_chunk(circuit, T, tol, dist, ratiometric, trials, seed):
+    """errors (trials x len(T), float32) of one batch of sampled circuits"""
+    rng = np.random.RandomState(seed)
+
+    def sample(name):
+        t = tol.get(name, 0.0)
+        if dist == 'normal':
+            return 1 + rng.normal(0, t/3.0, (trials, 1))
+        return 1 + rng.uniform(-t, t, (trials, 1))
+
+    ntc = circuit.ntc
+    B, Rn = ntc.B*sample('B'), ntc.Rn*sample('Rn')
+    rs, rl, vref = circuit.rs*sample('rs'), circuit.rlin*sample('rlin'), circuit.vref*sample('vref')
+
+    #voltage of the actual circuit, read back through the nominal one
+    R = Rn*np.exp(B*(1/T - 1.0/ntc.Tn))
+    Rp = R*rl/(R+rl)
+    volts = Rp/(rs+Rp)
+    volts *= circuit.vref if ratiometric else vref
+
+    return (circuit.from_volts_array(volts) - T).astype(np.float32)
+
+
+def tolerance(circuit, T, trials=10**6, tol=None, dist='uniform', ratiometric=False,
+              percentiles=(0.5, 2.5, 50, 97.5, 99.5), workers=None, chunk=10**5, seed=0):
+    """Monte Carlo accuracy of a Circuit under component tolerances.
+       1) circuit, ntc_model.Circuit with a Beta Model ntc
+       2) T, temperatures to evaluate (K)
+       3) trials, number of sampled circuits
+       4) tol, {name: relative tolerance} for rs, rlin, vref, B and Rn,
+          defaults to TOLERANCES, missing names are exact
+       5) dist, 'uniform' within +-tol or 'normal' with tol as 3 sigma
+       6) ratiometric, True when the ADC reference is vref itself, so
+          vref errors cancel
+       7) percentiles, of the signed error, per temperature
+       8) workers, processes to split the batches over, None runs in process
+       9) chunk, trials per batch
+       10) seed, the run is repeatable for a given seed and chunk
+       Returns a Tolerance. Raises TypeError for an ntc other than a Model and
+       ValueError for a non positive trials or chunk or an unknown dist."""
+    if not isinstance(circuit.ntc, Model):
+        raise TypeError('tolerance needs a Beta Model ntc, not {}'.format(type(circuit.ntc).__name__))
+    if trials < 1:
+        raise ValueError('trials must be positive')
+    if chunk < 1:
+        raise ValueError('chunk must be positive')
+    if dist not in ('uniform', 'normal'):
+        raise ValueError("dist must be 'uniform' or 'normal', not {!r}".format(dist))
+
+    T = np.atleast_1d(np.asarray(T, dtype=float))
+    tol = dict(TOLERANCES if tol is None else tol)
+    unknown = set(tol) - set(TOLERANCES)
+    if unknown:
+        raise ValueError('unknown tolerances: {}'.format(', '.join(sorted(unknown))))
+
+    jobs = [(circuit, T, tol, dist, ratiometric, min(chunk, trials-i), [seed, i//chunk])
+            for i in range(0, trials, chunk)]
+    if workers is None:
+        errors = [_tolerance_chunk(*job) for job in jobs]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(workers) as pool:
+            errors = list(pool.map(_tolerance_chunk, *zip(*jobs)))
+    errors = np.concatenate(errors)
+
+    return Tolerance(T, tuple(percentiles), np.percentile(errors, percentiles, axis=0),
+                     np.abs(errors).max(axis=0))
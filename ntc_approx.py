@@ -0,0 +1,230 @@
+#Piecewise polynomial approximation of NTC Thermistor conversions
+#Fell free to modify, improve, hack!
+#Replaces a resistance or ADC code to temperature conversion by short
+#polynomials fitted at Chebyshev nodes, one per segment, with segments halved
+#until each meets a maximum error. Evaluation is a segment lookup and a Horner
+#polynomial: multiply-adds only, no log.
+#Run this file for a benchmark against the models' own RtoT.
+#All temperatures are in degrees Kelvin and all resistance values are in kilo ohms
+
+from bisect import bisect_right
+
+import numpy as np
+
+
+class Piecewise(object):
+    """A piecewise polynomial y(x) on breaks[0]..breaks[-1].
+    Segment i covers breaks[i]..breaks[i+1] and evaluates
+    t = x - mid[i], y = c0*t**d + ... + cd by Horner.
+    When the breaks lie on a grid of 2**n equal steps, as fit() makes them,
+    the segment is found by one multiply and an index table, else by bisection.
+    max_error is the largest error seen against the approximated function
+    on the check grid, tol the error asked for.
+    Values outside the range raise ValueError."""
+
+    def __init__(self, breaks, coef, max_error=None, tol=None):
+        """initialize from the segment breaks and the per segment polynomial
+        coefficients in x - mid, highest power first"""
+
+        self.breaks = [float(b) for b in breaks]
+        self.coef = [tuple(float(c) for c in row) for row in coef]
+        if len(self.coef) != len(self.breaks)-1:
+            raise ValueError('need one coefficient row per segment')
+        self.mid = [(a+b)/2 for a, b in zip(self.breaks, self.breaks[1:])]
+        self.max_error = max_error
+        self.tol = tol
+
+        #segment index table over the finest grid, if the breaks are on one
+        self.index = None
+        lo, hi = self.breaks[0], self.breaks[-1]
+        steps = 1
+        for a, b in zip(self.breaks, self.breaks[1:]):
+            while (b-a)*steps < (hi-lo)*0.75:
+                steps *= 2
+        if steps <= 1<<16:
+            pos = [(b-lo)*steps/(hi-lo) for b in self.breaks]
+            if all(abs(p-round(p)) < 1e-6 for p in pos):
+                pos = [int(round(p)) for p in pos]
+                self.index = []
+                for i in range(len(self.coef)):
+                    self.index += [i]*(pos[i+1]-pos[i])
+                self.index.append(len(self.coef)-1)
+                self._step = steps/(hi-lo)
+
+    @classmethod
+    def fit(cls, f, lo, hi, tol, degree=3, samples=256, max_segments=1<<16):
+        """Returns a Piecewise approximating f on lo..hi within tol.
+           1) f, vectorized function of a numpy array
+           2) lo, hi, range of x
+           3) tol, maximum absolute error
+           4) degree, of the polynomials
+           5) samples, points per segment the error is checked on
+           6) max_segments, raise ValueError rather than split further
+           Each segment interpolates f at degree+1 Chebyshev nodes, close to
+           the minimax polynomial, and is halved until its error on the check
+           grid is within tol. The reported max_error is measured on that grid,
+           which is dense enough for the smooth NTC curves to bound the error
+           between its points too."""
+
+        n = degree + 1
+        nodes = np.cos(np.pi*(np.arange(n)+0.5)/n)[::-1]
+        to_power = np.linalg.inv(np.vander(nodes, n))
+        check = np.linspace(-1.0, 1.0, samples)
+        powers = np.vander(check, n)
+
+        pending = np.array([[lo, hi]], dtype=float)
+        done = []
+        max_error = 0.0
+        while len(pending):
+            if len(done) + len(pending) > max_segments:
+                raise ValueError('tol {} needs more than {} segments'.format(tol, max_segments))
+            mid = pending.mean(axis=1)[:, None]
+            half = (pending[:, 1:] - pending[:, :1])/2
+
+            #all pending segments fitted and checked in one pass each
+            #the check grid ends are kept within lo..hi against rounding, for
+            #functions that raise out of range
+            coef = f(mid + half*nodes).dot(to_power.T)
+            err = np.abs(coef.dot(powers.T) - f(np.clip(mid + half*check, lo, hi))).max(axis=1)
+
+            ok = err <= tol
+            done += [(a, b, c) for (a, b), c in zip(pending[ok], coef[ok])]
+            if ok.any():
+                max_error = max(max_error, err[ok].max())
+            split = pending[~ok]
+            centre = split.mean(axis=1)
+            pending = np.concatenate([np.stack([split[:, 0], centre], axis=1),
+                                      np.stack([centre, split[:, 1]], axis=1)])
+
+        #u = (x - mid)/half, so the power k coefficient scales by half**-k
+        done.sort(key=lambda seg: seg[0])
+        breaks = np.array([seg[0] for seg in done] + [done[-1][1]])
+        half = np.diff(breaks)[:, None]/2
+        coef = np.array([seg[2] for seg in done]) / half**np.arange(degree, -1, -1)
+        return cls(breaks, coef, max_error, tol)
+
+    def __len__(self):
+        return len(self.coef)
+
+    def __call__(self, x):
+        """Returns the approximated value at x"""
+
+        x = float(x)
+        breaks = self.breaks
+        if not (breaks[0] <= x <= breaks[-1]):
+            raise ValueError('{} is outside the approximation range {}..{}'.format(x, breaks[0], breaks[-1]))
+
+        if self.index is not None:
+            i = self.index[int((x - breaks[0])*self._step)]
+        else:
+            i = min(bisect_right(breaks, x), len(self.coef)) - 1
+        t = x - self.mid[i]
+        coef = self.coef[i]
+        y = coef[0]
+        for c in coef[1:]:
+            y = y*t + c
+        return y
+
+    def array(self, x):
+        """Returns the approximated values for an array of x"""
+
+        if not hasattr(self, '_np'):
+            index = None if self.index is None else np.array(self.index, dtype=np.intp)
+            self._np = (np.array(self.breaks), index, np.array(self.mid), np.array(self.coef).T.copy())
+        breaks, index, mid, coef = self._np
+
+        x = np.asarray(x, dtype=float)
+        if np.any(x < breaks[0]) or np.any(x > breaks[-1]):
+            raise ValueError('a value is outside the approximation range {}..{}'.format(breaks[0], breaks[-1]))
+
+        if index is not None:
+            i = index.take(((x - breaks[0])*self._step).astype(np.intp))
+        else:
+            i = np.clip(np.searchsorted(breaks, x, side='right'), 1, len(breaks)-1) - 1
+        t = x - mid.take(i)
+        y = coef[0].take(i)
+        for c in coef[1:]:
+            y *= t
+            y += c.take(i)
+        return y
+
+
+def _vectorized(obj, name):
+    """obj.name_array if there is one, else the scalar obj.name vectorized"""
+    return getattr(obj, name+'_array', None) or np.vectorize(getattr(obj, name), otypes=[float])
+
+
+def _table_range(ntc, T_lo, T_hi):
+    """Raises ValueError if T_lo..T_hi leaves the table of an interpolated
+    thermister, whose RtoT and TtoR silently default out of range values"""
+    if hasattr(ntc, 'therm_temp'):
+        t_min, t_max = ntc.therm_temp[-1], ntc.therm_temp[0]
+        if not (t_min <= min(T_lo, T_hi) and max(T_lo, T_hi) <= t_max):
+            raise ValueError('{}..{} K is outside the table range {}..{} K'.format(T_lo, T_hi, t_min, t_max))
+
+
+def rtot(ntc, T_lo, T_hi, tol=0.01, degree=3, **kw):
+    """Returns a Piecewise resistance to temperature conversion for an ntc
+       (Model, SteinhartHart or an interpolated table) between two temperatures.
+       tol is the maximum error in K; other keywords go to Piecewise.fit.
+       Raises ValueError if a table does not cover T_lo..T_hi."""
+    _table_range(ntc, T_lo, T_hi)
+    if hasattr(ntc, 'therm_temp'):
+        #the table's own interpolators, they raise rather than default out of range
+        RtoT, TtoR = [getattr(f, 'array', f) for f in (ntc._RtoT, ntc._TtoR)]
+    else:
+        RtoT, TtoR = _vectorized(ntc, 'RtoT'), _vectorized(ntc, 'TtoR')
+    R = np.asarray(TtoR(np.array([T_hi, T_lo], dtype=float)))
+    if hasattr(ntc, 'therm_res'):
+        R = np.clip(R, ntc.therm_res[0], ntc.therm_res[-1])
+    return Piecewise.fit(RtoT, R.min(), R.max(), tol, degree, **kw)
+
+
+def codes(circuit, bits, T_lo, T_hi, tol=0.01, degree=3, vfs=None, **kw):
+    """Returns a Piecewise ADC code to temperature conversion for an
+       ntc_model.Circuit between two temperatures, see Circuit.from_code.
+       tol is the maximum error in K; other keywords go to Piecewise.fit.
+       Raises ValueError if a table does not cover T_lo..T_hi."""
+    _table_range(circuit.ntc, T_lo, T_hi)
+    if vfs is None:
+        vfs = circuit.vref
+    ntc = circuit.ntc
+    if hasattr(ntc, 'RtoT_array') and hasattr(ntc, 'TtoR_array'):
+        f = lambda c: circuit.from_codes_array(c, bits, vfs)
+        c = circuit.to_codes_array(np.array([T_hi, T_lo], dtype=float), bits, vfs)
+    else:
+        f = np.vectorize(lambda c: circuit.from_code(c, bits, vfs), otypes=[float])
+        c = np.array([circuit.to_code(T_hi, bits, vfs), circuit.to_code(T_lo, bits, vfs)])
+    return Piecewise.fit(f, c.min(), c.max(), tol, degree, **kw)
+
+
+if __name__ == "__main__":
+    import timeit
+    from ntc_model import Model, SteinhartHart, Circuit
+
+    def best(f, number=1):
+        return min(timeit.repeat(f, number=number, repeat=5))/number
+
+    #Vishay NTCLE413 (B3435) points from -40 to 105 C
+    sh = SteinhartHart.fit([190.953, 42.636, 10.0, 3.0197, 0.85833], [233.0, 263.0, 298.0, 333.0, 378.0])
+
+    T_lo, T_hi = 233.0, 398.0
+    for ntc in (Model(3435, 10, 298), sh):
+        R = np.random.uniform(ntc.TtoR(T_hi), ntc.TtoR(T_lo), 10**6)
+        exact = ntc.RtoT_array(R)
+        print('{} -40..125 C: RtoT_array {:.1f} ms per 1e6, RtoT {:.2f} us'
+              .format(type(ntc).__name__, best(lambda: ntc.RtoT_array(R))*1e3, best(lambda: ntc.RtoT(12.3), 10**5)*1e6))
+        for tol, degree in ((0.01, 3), (0.001, 3), (0.001, 5)):
+            p = rtot(ntc, T_lo, T_hi, tol, degree)
+            print('  tol {} K degree {}: {} segments, bound {:.1e} K, error {:.1e} K, array {:.1f} ms, call {:.2f} us'
+                  .format(tol, degree, len(p), p.max_error, np.abs(p.array(R)-exact).max(),
+                          best(lambda: p.array(R))*1e3, best(lambda: p(12.3), 10**5)*1e6))
+
+    circuit = Circuit(Model(3435, 10, 298), 3.3, 10, 10)
+    p = codes(circuit, 16, T_lo, T_hi, 0.01)
+    c = np.random.uniform(p.breaks[0], p.breaks[-1], 10**6)
+    print('16 bit codes: from_codes_array {:.1f} ms per 1e6, from_code {:.2f} us'
+          .format(best(lambda: circuit.from_codes_array(c, 16))*1e3, best(lambda: circuit.from_code(30000, 16), 10**5)*1e6))
+    print('  tol 0.01 K degree 3: {} segments, bound {:.1e} K, error {:.1e} K, array {:.1f} ms, call {:.2f} us'
+          .format(len(p), p.max_error, np.abs(p.array(c)-circuit.from_codes_array(c, 16)).max(),
+                  best(lambda: p.array(c))*1e3, best(lambda: p(30000), 10**5)*1e6))
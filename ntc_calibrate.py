@@ -0,0 +1,77 @@
+#Batch calibration of NTC Thermistor probes for ntc_model
+#Fell free to modify, improve, hack!
+#Fits Beta (B, Rn at Tn) or Steinhart-Hart coefficients to reference bath
+#measurements of many probes at once: every probe is one row of a stacked
+#linear least squares problem in ln(R), 1/T space, solved without a loop.
+#All temperatures are in degrees Kelvin and all resistance values are in kilo ohms
+
+import collections
+
+import numpy as np
+
+from ntc_model import Model, SteinhartHart
+
+#Result of fit, one entry or row per probe:
+#ready to use Model or SteinhartHart objects, the fitted parameters array
+#(B, Rn) or (A, B, C), temperature residuals fitted - reference (K) per
+#measurement, their rms and worst absolute value (K)
+Calibration = collections.namedtuple('Calibration', 'models params residual rms worst')
+
+
+def resistance(volts, circuit):
+    """Returns the Thermistor resistances behind measured ADC voltages,
+       inverting the divider of an ntc_model.Circuit. Broadcasts."""
+    volts = np.asarray(volts, dtype=float)
+    return volts/((circuit.vref-volts)/circuit.rs - volts/circuit.rlin)
+
+
+def fit(T, R=None, volts=None, circuit=None, model='beta', Tn=298.0):
+    """Fits every probe's curve in one stacked least squares solve.
+       1) T, reference temperatures, (probes, points) or (points,) when all
+          probes saw the same bath temperatures
+       2) R, measured resistances, (probes, points)
+       3) volts, circuit, measured ADC voltages and the Circuit they were
+          taken with, instead of R
+       4) model, 'beta' for Model(B, Rn, Tn) or 'steinhart-hart'
+       5) Tn, normalizing temperature of the Beta models
+       Returns a Calibration."""
+    if R is None:
+        if volts is None or circuit is None:
+            raise ValueError('fit needs R, or volts and circuit')
+        R = resistance(volts, circuit)
+    T, R = np.broadcast_arrays(np.asarray(T, dtype=float), np.asarray(R, dtype=float))
+    T, R = np.atleast_2d(T), np.atleast_2d(R)
+    y = 1/T
+    x = np.log(R)
+
+    if model == 'beta':
+        if T.shape[-1] < 2:
+            raise ValueError('a Beta fit needs at least 2 points per probe')
+        #ln(R) = ln(Rn) + B*(1/T - 1/Tn), a straight line per probe
+        u = y - 1.0/Tn
+        du = u - u.mean(axis=-1, keepdims=True)
+        dx = x - x.mean(axis=-1, keepdims=True)
+        B = (du*dx).sum(axis=-1)/(du*du).sum(axis=-1)
+        lnRn = x.mean(axis=-1) - B*u.mean(axis=-1)
+        params = np.stack([B, np.exp(lnRn)], axis=-1)
+        fitted = 1/(1.0/Tn + (x - lnRn[:, None])/B[:, None])
+        models = [Model(b, rn, Tn) for b, rn in params]
+    elif model == 'steinhart-hart':
+        if T.shape[-1] < 3:
+            raise ValueError('a Steinhart-Hart fit needs at least 3 points per probe')
+        #1/T = A + B*ln(R) + C*ln(R)**3, normal equations stacked per probe,
+        #columns scaled to unit norm to keep them well conditioned
+        X = np.stack([np.ones_like(x), x, x**3], axis=-1)
+        scale = np.sqrt((X*X).sum(axis=-2))
+        X = X/scale[:, None, :]
+        XtX = np.einsum('pni,pnj->pij', X, X)
+        Xty = np.einsum('pni,pn->pi', X, y)
+        params = np.linalg.solve(XtX, Xty[..., None])[..., 0]/scale
+        fitted = 1/(params[:, :1] + params[:, 1:2]*x + params[:, 2:]*x**3)
+        models = [SteinhartHart(*p) for p in params]
+    else:
+        raise ValueError("model must be 'beta' or 'steinhart-hart'")
+
+    residual = fitted - T
+    return Calibration(models, params, residual,
+                       np.sqrt((residual*residual).mean(axis=-1)), np.abs(residual).max(axis=-1))
@@ -0,0 +1,155 @@
+#Fixed point ADC code to temperature conversion for microcontrollers
+#Fell free to modify, improve, hack!
+#generate() samples an ntc_model.Circuit at every 2**shift-th ADC code into
+#a table of int16 centi-degrees Celsius. Codes in between are interpolated
+#linearly with integer multiply, add and shift only. The table exports as a
+#C header or a Python array('h'), and FixedTable evaluates it in pure integer
+#Python, the same arithmetic the C header does, so both give identical results.
+#The evaluator needs no numpy, only generate() does.
+
+from array import array
+
+_C_HEADER = """/* {name}: ADC code to temperature in centi-degrees Celsius
+ * generated by ntc_fixed from {circuit}
+ * {bits} bit ADC, {step} codes per segment, max error {error:.4f} C over {lo:.2f}..{hi:.2f} C
+ */
+#ifndef {guard}
+#define {guard}
+
+#include <stdint.h>
+
+#define {NAME}_BITS {bits}
+#define {NAME}_SHIFT {shift}
+
+static const int16_t {name}_table[{size}] = {{
+{rows}
+}};
+
+/* codes 0..(1 << {NAME}_BITS)-1 to centi-degrees Celsius */
+static inline int16_t {name}_centi(uint32_t code)
+{{
+    uint32_t i = code >> {NAME}_SHIFT;
+    uint32_t f = code & ((1u << {NAME}_SHIFT) - 1);
+    uint32_t drop = (uint32_t)({name}_table[i] - {name}_table[i + 1]);
+    return (int16_t)({name}_table[i] - (int32_t)((drop * f + {half}u) >> {NAME}_SHIFT));
+}}
+
+#endif
+"""
+
+
+class FixedTable(object):
+    """An integer ADC code to centi-degree Celsius conversion.
+    1) bits, ADC resolution
+    2) shift, log2 of the codes per segment
+    3) table, (1 << bits-shift) + 1 centi-degree values at codes i << shift,
+       not increasing, as temperature falls while the code rises
+    4) zero, the Kelvin temperature of 0 C used for the table
+    5) max_error, largest error against Circuit.from_volts in degrees, if known
+    6) T_lo, T_hi, the range in K max_error holds for
+    7) source, description of the circuit the table came from"""
+
+    def __init__(self, bits, shift, table, zero=273, max_error=None, T_lo=None, T_hi=None, source=''):
+        self.bits = int(bits)
+        self.shift = int(shift)
+        self.table = array('h', table)
+        self.zero = zero
+        self.max_error = max_error
+        self.T_lo = T_lo
+        self.T_hi = T_hi
+        self.source = source
+
+        if not 0 <= self.shift <= min(self.bits, 15):
+            raise ValueError('shift must be within 0..min(bits, 15)')
+        if len(self.table) != (1 << (self.bits-self.shift)) + 1:
+            raise ValueError('table needs (1 << bits-shift) + 1 values')
+        if any(a < b for a, b in zip(self.table, self.table[1:])):
+            raise ValueError('table must not increase with the code')
+
+        self._mask = (1 << self.shift) - 1
+        self._half = (1 << self.shift) >> 1
+
+    def __call__(self, code):
+        """Returns the temperature in centi-degrees Celsius for an ADC code,
+        with integer arithmetic only"""
+
+        if not 0 <= code < (1 << self.bits):
+            raise ValueError('code {} is outside 0..{}'.format(code, (1 << self.bits)-1))
+        t = self.table
+        i = code >> self.shift
+        return t[i] - (((t[i]-t[i+1])*(code & self._mask) + self._half) >> self.shift)
+
+    def to_c(self, name='ntc'):
+        """Returns a C header with the table and a static inline evaluator"""
+
+        values = ['{:6d},'.format(v) for v in self.table]
+        rows = '\n'.join('    ' + ' '.join(values[i:i+10]) for i in range(0, len(values), 10))
+        return _C_HEADER.format(name=name, NAME=name.upper(), guard=name.upper()+'_TABLE_H',
+                                circuit=self.source or 'a circuit', bits=self.bits, shift=self.shift,
+                                step=1 << self.shift, half=self._half, size=len(self.table), rows=rows,
+                                error=self.max_error if self.max_error is not None else float('nan'),
+                                lo=(self.T_lo if self.T_lo is not None else self.table[-1]/100.0 + self.zero) - self.zero,
+                                hi=(self.T_hi if self.T_hi is not None else self.table[0]/100.0 + self.zero) - self.zero)
+
+
+def generate(circuit, bits, tol=0.05, T_lo=233.0, T_hi=398.0, vfs=None, zero=273):
+    """Returns the smallest FixedTable for a Circuit that is within tol.
+       1) circuit, ntc_model.Circuit
+       2) bits, ADC resolution, up to 16
+       3) tol, maximum error against Circuit.from_volts in degrees
+       4) T_lo, T_hi, temperature range in K that tol must hold for. Outside
+          it the table follows the curve until int16 saturates, and codes
+          beyond the open thermister voltage read as the int16 minimum
+       5) vfs, ADC full scale voltage, defaults to vref as in from_code
+       6) zero, Kelvin temperature of 0 C, 273 as in the models and tables
+       Every code is checked, the reported max_error is exact for codes whose
+       reference temperature lies within T_lo..T_hi.
+       Raises ValueError if even a full table (shift 0) misses tol."""
+    import numpy as np
+
+    if not 0 < bits <= 16:
+        raise ValueError('bits must be within 1..16')
+    if not -327.68 <= T_lo-zero < T_hi-zero <= 327.67:
+        raise ValueError('T_lo..T_hi must fit int16 centi-degrees')
+    low, high = zero - 327.68, zero + 327.67
+    if vfs is None:
+        vfs = circuit.vref
+
+    #reference at every code. Codes past the open thermister voltage have no
+    #positive resistance and stand for the coldest end. Nodes are not clipped
+    #to T_lo..T_hi, a kink there would cost the neighbouring segments accuracy
+    codes = np.arange((1 << bits) + 1)
+    volts = codes * (float(vfs) / (1 << bits))
+    i_ntc = (circuit.vref-volts)/circuit.rs - volts/circuit.rlin
+    ref = np.array([circuit.from_code(c, bits, vfs) if i > 0 else -np.inf for c, i in zip(codes, i_ntc)])
+    centi = np.round((np.clip(ref, low, high) - zero)*100).astype(np.int64)
+    if np.any(np.diff(centi) > 0):
+        raise ValueError('the conversion is not monotonic over the ADC codes, narrow T_lo..T_hi')
+
+    inside = (ref[:-1] >= T_lo) & (ref[:-1] <= T_hi)
+    for shift in range(min(bits, 15), -1, -1):
+        table = centi[::1 << shift]
+        i = codes[:-1] >> shift
+        f = codes[:-1] & ((1 << shift) - 1)
+        out = table[i] - (((table[i]-table[i+1])*f + ((1 << shift) >> 1)) >> shift)
+        error = np.abs(out/100.0 + zero - ref[:-1])[inside].max() if inside.any() else 0.0
+        if error <= tol:
+            return FixedTable(bits, shift, table.tolist(), zero, float(error), T_lo, T_hi,
+                              '{}{} vref {} rs {} rlin {}'.format(*circuit.values))
+
+    raise ValueError('tol {} is below the centi-degree table error {:.4f}'.format(tol, error))
+
+
+if __name__ == "__main__":
+    import sys
+    from ntc_model import Model, Circuit
+
+    circuit = Circuit(Model(3435, 10, 298), 3.3, 10, 10)
+    for bits, tol in ((10, 0.1), (12, 0.05), (16, 0.01)):
+        fixed = generate(circuit, bits, tol)
+        worst = max(abs(fixed(c)/100.0 + fixed.zero - circuit.from_code(c, bits))
+                    for c in range(1 << bits) if 233 <= circuit.from_code(c, bits) <= 398)
+        print('{:2d} bits, tol {} C: {} entries ({} codes per segment), max error {:.4f} C, evaluator {:.4f} C'
+              .format(bits, tol, len(fixed.table), 1 << fixed.shift, fixed.max_error, worst))
+    if '--header' in sys.argv:
+        print(fixed.to_c())
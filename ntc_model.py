@@ -3,34 +3,37 @@
 #Note! Temperature range is limited to a range between 1 and 98C
 #OZ1LQO 2014.05.29
 
+import collections
 import math
+import threading
 
-class Model(object):
-    """A class to work with NTC Thermistors.
-    Input, is B, Rn (resistance at Tn), Tn (normalized temperature).
-    For the B3470 Thermistor that should be B=3470, Rn=10k, Tn=298.
-    Ie. a=Ntc(3470,10,298)
-    This Class uses the theoretical formulas for a modeled NTC Thermistor.
-    All temperatures are in degrees Kelvin and all resistance values are in kilo ohms"""
+class _Thermistor(object):
+    """Immutable base for the closed form thermistor models.
+    Subclasses set their slots in __init__ through _set and provide values,
+    TtoR and RtoT."""
 
-    def __init__(self, B, Rn, Tn):
-        """initialize the NTC with the theoretical parameters"""
-  
-        self.B=float(B)
-        self.Rn=float(Rn)
-        self.Tn=float(Tn)
-              
-    def __str__(self):
-        """Returns the NTC's data"""
-        rep="Hi, I'm an NTC Thermistor. These are my parameters:\n"
-        rep+="B Value:"+str(self.B)+"\nNominal Value(kOhm):"+str(self.Rn)+"\nNominal Temperature(C):"+str(self.Tn-273)
-        return rep
-        
-    @property
-    def values(self):
-        """method to return the current Thermostor parameters if needed"""
-        return self.B,self.Rn,self.Tn  
+    __slots__ = ()
+
+    def _set(self, name, value):
+        object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(type(self).__name__+' is immutable')
 
+    def __delattr__(self, name):
+        raise AttributeError(type(self).__name__+' is immutable')
+
+    def __reduce__(self):
+        return (type(self), self.values)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.values == other.values
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.values)
 
     def Rlin(self,T_hi=343,T_lo=298):
         """Calculates a suitable linearization resistor based on an input
@@ -52,26 +55,251 @@ class Model(object):
         
         return R_lin
 
+    def Rlin_array(self, T_hi, T_lo):
+        """Calculates the linearization resistors for arrays of temperature
+           intervals in one vectorized pass. T_hi and T_lo broadcast against
+           each other, so a grid of windows is T_hi[:, None], T_lo[None, :].
+           Requires numpy."""
+        import numpy as np
+
+        T_hi, T_lo = np.broadcast_arrays(np.asarray(T_hi, dtype=float), np.asarray(T_lo, dtype=float))
+        R_hi = self.TtoR_array(T_hi)
+        R_mid = self.TtoR_array((T_hi+T_lo)/2)
+        R_lo = self.TtoR_array(T_lo)
+
+        return (R_mid*(R_lo+R_hi)-2*R_lo*R_hi)/(R_lo+R_hi-(2*R_mid))
+
+
+class Model(_Thermistor):
+    """A class to work with NTC Thermistors.
+    Input, is B, Rn (resistance at Tn), Tn (normalized temperature).
+    For the B3470 Thermistor that should be B=3470, Rn=10k, Tn=298.
+    Ie. a=Ntc(3470,10,298)
+    This Class uses the theoretical formulas for a modeled NTC Thermistor.
+    All temperatures are in degrees Kelvin and all resistance values are in kilo ohms
+    Model objects are immutable, make a new one to change the parameters."""
+
+    __slots__ = ('B', 'Rn', 'Tn', '_c')
+
+    def __init__(self, B, Rn, Tn):
+        """initialize the NTC with the theoretical parameters"""
+
+        B=float(B)
+        Rn=float(Rn)
+        Tn=float(Tn)
+
+        self._set('B', B)
+        self._set('Rn', Rn)
+        self._set('Tn', Tn)
+
+        #one constant serves both conversions: with c = B/Tn - ln(Rn),
+        #T = B/(ln(R) + c) and R = exp(B/T - c)
+        self._set('_c', B/Tn - math.log(Rn))
+
+    def __str__(self):
+        """Returns the NTC's data"""
+        rep="Hi, I'm an NTC Thermistor. These are my parameters:\n"
+        rep+="B Value:"+str(self.B)+"\nNominal Value(kOhm):"+str(self.Rn)+"\nNominal Temperature(C):"+str(self.Tn-273)
+        return rep
+        
+    @property
+    def values(self):
+        """method to return the current Thermostor parameters if needed"""
+        return self.B,self.Rn,self.Tn  
+
+    @property
+    def steinhart_hart(self):
+        """the equivalent Steinhart-Hart (A, B, C) coefficients, C is 0"""
+        return self._c/self.B, 1/self.B, 0.0
+
     def TtoR(self,T=298):
         """Returns the corresponding modeled resistance from a temperature input
            Uses the parameter values given when creating the object: B, Tn, Rn"""
-        self.T=float(T)
-        return self.Rn*math.exp(self.B*((1/self.T)-(1/self.Tn)))
+        return math.exp(self.B/float(T) - self._c)
 
     def RtoT(self,R=10):
         """Returns the corresponding modeled temperature from a resistance input
            Uses the parameter values given when creating the object: B, Tn, Rn"""
         #check for gross interval
         if R < 0.1:
-            self.R = 0.1
+            R=0.1
         elif R > 1e6:
-            self.R = 1e6              
+            R=1e6              
         else:
-            self.R=float(R)
+            R=float(R)
         
-        return 1/((math.log(self.R/self.Rn)/self.B)+(1/self.Tn))
+        return self.B/(math.log(R) + self._c)
+
+    def TtoR_array(self, T):
+        """Returns the modeled resistances for an array of temperatures
+           in one vectorized pass. Requires numpy."""
+        import numpy as np
+
+        R = np.array(T, dtype=float)
+        np.divide(self.B, R, out=R)
+        R -= self._c
+        np.exp(R, out=R)
+        return R
+
+    def RtoT_array(self, R):
+        """Returns the modeled temperatures for an array of resistances
+           in one vectorized pass, clamped to the same gross interval as RtoT.
+           Requires numpy."""
+        import numpy as np
+
+        T = np.array(R, dtype=float)
+        np.clip(T, 0.1, 1e6, out=T)
+        np.log(T, out=T)
+        T += self._c
+        np.divide(self.B, T, out=T)
+        return T
+
+
+class SteinhartHart(_Thermistor):
+    """A class to work with NTC Thermistors using the Steinhart-Hart equation
+    1/T = A + B*ln(R) + C*ln(R)**3
+    Input is the three coefficients, or use fit() to get them from a
+    resistance vs. temperature table such as B3435_const.
+    All temperatures are in degrees Kelvin and all resistance values are in kilo ohms
+    SteinhartHart objects are immutable, make a new one to change the coefficients."""
+
+    __slots__ = ('A', 'B', 'C', '_B3C', '_inv2C')
+
+    def __init__(self, A, B, C):
+        """initialize the NTC with the Steinhart-Hart coefficients"""
+
+        A=float(A)
+        B=float(B)
+        C=float(C)
+        if C == 0:
+            raise ValueError('C must be nonzero, use Model for a pure Beta curve')
+
+        self._set('A', A)
+        self._set('B', B)
+        self._set('C', C)
+
+        #constants for the inverse (TtoR) solution of the cubic
+        self._set('_B3C', B/(3*C))
+        self._set('_inv2C', 1/(2*C))
+
+    @classmethod
+    def fit(cls, resistance, temperature):
+        """Returns a SteinhartHart fitted by least squares to a table.
+           1) resistance, sequence of resistances
+           2) temperature, sequence of the matching temperatures
+           Pass a table dict as fit(**B3435_const)"""
+
+        if len(resistance) != len(temperature) or len(resistance) < 3:
+            raise ValueError('fit needs at least 3 matching resistance/temperature pairs')
+
+        #normal equations for 1/T = A + B*x + C*x**3, x = ln(R)
+        m = [[0.0]*4 for i in range(3)]
+        for r, t in zip(resistance, temperature):
+            x = math.log(r)
+            row = (1.0, x, x**3)
+            for i in range(3):
+                for j in range(3):
+                    m[i][j] += row[i]*row[j]
+                m[i][3] += row[i]/t
+
+        #gaussian elimination with partial pivoting
+        for i in range(3):
+            p = max(range(i, 3), key=lambda k: abs(m[k][i]))
+            m[i], m[p] = m[p], m[i]
+            for k in range(i+1, 3):
+                f = m[k][i]/m[i][i]
+                for j in range(i, 4):
+                    m[k][j] -= f*m[i][j]
+
+        coef = [0.0]*3
+        for i in (2, 1, 0):
+            coef[i] = (m[i][3] - sum(m[i][j]*coef[j] for j in range(i+1, 3)))/m[i][i]
+
+        return cls(*coef)
+
+    def __str__(self):
+        """Returns the NTC's data"""
+        rep="Hi, I'm a Steinhart-Hart NTC Thermistor. These are my parameters:\n"
+        rep+="A:"+str(self.A)+"\nB:"+str(self.B)+"\nC:"+str(self.C)
+        return rep
+
+    @property
+    def values(self):
+        """method to return the current Thermostor parameters if needed"""
+        return self.A,self.B,self.C
+
+    @property
+    def steinhart_hart(self):
+        """the Steinhart-Hart (A, B, C) coefficients"""
+        return self.A,self.B,self.C
+
+    def TtoR(self,T=298):
+        """Returns the corresponding modeled resistance from a temperature input
+           Uses the closed form solution of the Steinhart-Hart cubic"""
+        y=(self.A-1/float(T))*self._inv2C
+        z=math.sqrt(self._B3C**3+y*y)
+        return math.exp(_cbrt(z-y)-_cbrt(z+y))
+
+    def RtoT(self,R=10):
+        """Returns the corresponding modeled temperature from a resistance input
+           Uses the coefficients given when creating the object: A, B, C"""
+        #check for gross interval
+        if R < 0.1:
+            R=0.1
+        elif R > 1e6:
+            R=1e6
+        else:
+            R=float(R)
+
+        x=math.log(R)
+        return 1/(self.A+x*(self.B+self.C*x*x))
+
+    def TtoR_array(self, T):
+        """Returns the modeled resistances for an array of temperatures
+           in one vectorized pass. Requires numpy."""
+        import numpy as np
+
+        y = np.array(T, dtype=float, ndmin=1)
+        np.reciprocal(y, out=y)
+        y -= self.A
+        y *= -self._inv2C
+        z = np.sqrt(self._B3C**3 + y*y)
+        R = np.cbrt(z-y)
+        R -= np.cbrt(z+y)
+        np.exp(R, out=R)
+        return R.reshape(np.shape(T))
+
+    def RtoT_array(self, R):
+        """Returns the modeled temperatures for an array of resistances
+           in one vectorized pass, clamped to the same gross interval as RtoT.
+           Requires numpy."""
+        import numpy as np
+
+        x = np.array(R, dtype=float, ndmin=1)
+        np.clip(x, 0.1, 1e6, out=x)
+        np.log(x, out=x)
+        T = x*x
+        T *= self.C
+        T += self.B
+        T *= x
+        T += self.A
+        np.reciprocal(T, out=T)
+        return T.reshape(np.shape(R))
+
+
+def _pop_touch(cache, key):
+    """OrderedDict.move_to_end for python 2"""
+    cache[key] = cache.pop(key)
+
+#marks a key as most recently used in the Circuit cache, see enable_cache
+_touch = getattr(collections.OrderedDict, 'move_to_end', _pop_touch)
+
+
+def _cbrt(x):
+    """real cube root, also for negative x"""
+    return math.copysign(abs(x)**(1.0/3), x)
+
 
-    
 class Circuit(object):
     def __init__(self, ntc, vref, rs, rp):
         """This class calculates a temperature from a setup as in the schematic
@@ -82,12 +310,65 @@ class Circuit(object):
            4) rp, Value of linearization resistor in paralles with the ntc device
            Note, again, that all resistors are in kOhm's.
         """
+        self._cache = None
+        self._cache_lock = threading.Lock()
         self.ntc = ntc
         self.vref = float(vref)
         self.rs = float(rs)
         self.rlin = float(rp)
         return
+
+    def __setattr__(self, name, value):
+        #a changed circuit invalidates the memoized conversions
+        object.__setattr__(self, name, value)
+        cache = self._cache
+        if name in ('ntc', 'vref', 'rs', 'rlin') and cache is not None:
+            with self._cache_lock:
+                cache.clear()
     
+    def __getstate__(self):
+        #a lock does not pickle, copies get their own lock and an empty cache
+        state = self.__dict__.copy()
+        del state['_cache_lock']
+        if state['_cache'] is not None:
+            state['_cache'] = collections.OrderedDict()
+            state['_cache_stats'] = [0, 0]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__dict__['_cache_lock'] = threading.Lock()
+
+    @property
+    def values(self):
+        """method to return the circuit and ntc parameters"""
+        return type(self.ntc).__name__, self.ntc.values, self.vref, self.rs, self.rlin
+
+    def enable_cache(self, size=256):
+        """Memoizes from_volts in a least recently used cache of up to size
+           readings. ADC readings are quantized, so a steady channel keeps
+           returning the same few codes. The cache is cleared whenever
+           ntc, vref, rs or rlin is assigned; ntc models are immutable.
+           The cache is shared by all threads using the Circuit, lookups and
+           updates hold a lock, the conversion itself runs outside it."""
+
+        self._cache_size = int(size)
+        self._cache_stats = [0, 0]
+        self._cache = collections.OrderedDict()
+
+    def disable_cache(self):
+        """Turns the from_volts cache off"""
+        self._cache = None
+
+    @property
+    def cache_info(self):
+        """(hits, misses, current size, maximum size) of the from_volts cache"""
+        cache = self._cache
+        if cache is None:
+            return None
+        with self._cache_lock:
+            return self._cache_stats[0], self._cache_stats[1], len(cache), self._cache_size
+
 
     #def measurement(self, Rlin=2, Rs=2.2, Vs=5, Vadc=2):
     def from_volts(self, vadc):
@@ -97,6 +378,21 @@ class Circuit(object):
         """
 
         vadc=float(vadc)
+
+        cache = self._cache
+        if cache is not None:
+            #acquire and release, a with block costs a hit noticeably more
+            lock = self._cache_lock
+            lock.acquire()
+            try:
+                degK = cache[vadc]
+                _touch(cache, vadc)
+                self._cache_stats[0] += 1
+                return degK
+            except KeyError:
+                self._cache_stats[1] += 1
+            finally:
+                lock.release()
         
         #current through the series resistor
         i_rser=(self.vref-vadc)/self.rs
@@ -113,10 +409,379 @@ class Circuit(object):
         #Finally, get temperature of the Thermistor
         degK=self.ntc.RtoT(r_ntc)
 
+        if cache is not None:
+            with self._cache_lock:
+                cache[vadc] = degK
+                if len(cache) > self._cache_size:
+                    cache.popitem(last=False)
+
         return degK
-        
-    
-if __name__ == "__main__":
+
+    def from_code(self, code, bits, vfs=None):
+        """Calculates a temperature from one raw ADC code, see from_volts.
+           1) ADC code.
+           2) bits, ADC resolution.
+           3) vfs, ADC full scale voltage, defaults to vref for a ratiometric setup.
+        """
+        if vfs is None:
+            vfs = self.vref
+        return self.from_volts(code * (float(vfs) / (1 << bits)))
+
+    def to_volts(self, T):
+        """This method calculates the voltage expected at the ADC for a
+           thermister temperature, the exact inverse of from_volts.
+           1) Temperature in degrees Kelvin.
+        """
+        r_ntc=self.ntc.TtoR(T)
+        #Thermistor in parallel with the linearization resistor
+        r_p=r_ntc*self.rlin/(r_ntc+self.rlin)
+        #divider with the series resistor
+        return self.vref*r_p/(self.rs+r_p)
+
+    def to_code(self, T, bits, vfs=None):
+        """Returns the ADC code expected for a thermister temperature, as an
+           unrounded float so comparator thresholds can be floored or ceiled.
+           1) Temperature in degrees Kelvin.
+           2) bits, ADC resolution.
+           3) vfs, ADC full scale voltage, defaults to vref for a ratiometric setup.
+        """
+        if vfs is None:
+            vfs = self.vref
+        return self.to_volts(T) * ((1 << bits) / float(vfs))
+
+    def to_volts_array(self, T):
+        """Calculates the expected ADC voltages for an array of temperatures
+           in one vectorized pass. Requires numpy and an ntc object with TtoR_array.
+        """
+        r_ntc = self.ntc.TtoR_array(T)
+        r_p = r_ntc*self.rlin/(r_ntc+self.rlin)
+        return self.vref*r_p/(self.rs+r_p)
+
+    def to_codes_array(self, T, bits, vfs=None):
+        """Returns the unrounded ADC codes expected for an array of temperatures.
+           See to_code."""
+        if vfs is None:
+            vfs = self.vref
+        return self.to_volts_array(T) * ((1 << bits) / float(vfs))
+
+    def from_volts_array(self, vadc):
+        """Calculates temperatures for an array of measured voltages
+           in one vectorized pass. Requires numpy and an ntc object with RtoT_array.
+           1) Array of measured voltages at the ADC.
+        """
+        import numpy as np
+
+        vadc = np.asarray(vadc, dtype=float)
+
+        #current through the Thermistor: series current less linearization current
+        i_ntc = (self.vref-vadc)/self.rs - vadc/self.rlin
+        #Thermistor resistance, masking the divide by zero as from_volts does
+        r_ntc = np.divide(vadc, i_ntc, out=np.full(i_ntc.shape, 1e6), where=(i_ntc != 0))
+
+        return self.ntc.RtoT_array(r_ntc)
+
+    def from_codes_array(self, codes, bits, vfs=None):
+        """Calculates temperatures for an array of raw ADC codes.
+           1) Array of ADC codes.
+           2) bits, ADC resolution.
+           3) vfs, ADC full scale voltage, defaults to vref for a ratiometric setup.
+        """
+        import numpy as np
+
+        if vfs is None:
+            vfs = self.vref
+
+        vadc = np.asarray(codes, dtype=float) * (float(vfs) / (1 << bits))
+        return self.from_volts_array(vadc)
+
+    def stream(self, volts, chunk=4096):
+        """Generator that converts measured voltages chunk by chunk,
+           yielding an array of up to chunk temperatures at a time.
+           1) volts, any iterable of voltages (file, socket or serial reader)
+              or an array, which is sliced without copying.
+              Wrap an iterable of blocks in itertools.chain.from_iterable.
+           2) chunk, number of samples converted per vectorized call.
+           Memory use is bounded by chunk, not by the length of volts.
+        """
+        import numpy as np
+        from itertools import islice
+
+        if hasattr(volts, 'shape'):
+            for i in range(0, len(volts), chunk):
+                yield self.from_volts_array(volts[i:i+chunk])
+            return
+
+        volts = iter(volts)
+        while True:
+            block = np.fromiter(islice(volts, chunk), dtype=float)
+            if not len(block):
+                return
+            yield self.from_volts_array(block)
+
+    def build_lut(self, bits, vfs=None, max_bits=16):
+        """Precomputes a Lut of temperatures over every ADC code.
+           1) bits, ADC resolution.
+           2) vfs, ADC full scale voltage, defaults to vref.
+           3) max_bits, above this resolution the table is subsampled
+              to 2**max_bits segments and linearly interpolated.
+        """
+        import numpy as np
+
+        if vfs is None:
+            vfs = self.vref
+        vfs = float(vfs)
+
+        shift = max(bits - max_bits, 0)
+        codes = np.arange((1 << (bits - shift)) + 1, dtype=float) * (1 << shift)
+        table = self.from_codes_array(codes, bits, vfs).astype(np.float32)
+
+        return Lut(Lut.version(self, bits, vfs), bits, shift, table)
+
+
+class CircuitBank(object):
+    """A bank of thermister channels, each a Circuit with its own vref, rs,
+    rlin and closed form ntc (Model or SteinhartHart), converted together.
+    The per channel parameters are stored column wise in numpy arrays, so a
+    frame of all channels, or a frames x channels matrix, converts in one
+    broadcast operation. Requires numpy."""
+
+    def __init__(self, circuits):
+        """initialize the bank from a sequence of Circuit objects, one per channel"""
+        import numpy as np
+
+        self.circuits = tuple(circuits)
+        for c in self.circuits:
+            if not hasattr(c.ntc, 'steinhart_hart'):
+                raise TypeError('CircuitBank needs closed form ntc models, got '+type(c.ntc).__name__)
+
+        self.vref = np.array([c.vref for c in self.circuits])
+        self.rs = np.array([c.rs for c in self.circuits])
+        self.rlin = np.array([c.rlin for c in self.circuits])
+        #every model as 1/T = a + b*ln(R) + c*ln(R)**3
+        self.a, self.b, self.c = np.array([c.ntc.steinhart_hart for c in self.circuits]).T.copy()
+
+    def __len__(self):
+        return len(self.circuits)
+
+    def from_volts_array(self, vadc):
+        """Calculates temperatures for measured voltages, the last axis of
+           vadc is the channel: a frame of len(bank) voltages or a
+           frames x channels matrix. Same clamping and divide by zero
+           handling as Circuit.from_volts_array.
+        """
+        import numpy as np
+
+        vadc = np.asarray(vadc, dtype=float)
+
+        #current through the Thermistor: series current less linearization current
+        i_ntc = (self.vref-vadc)/self.rs - vadc/self.rlin
+        #Thermistor resistance, masking the divide by zero
+        x = np.divide(vadc, i_ntc, out=np.full(i_ntc.shape, 1e6), where=(i_ntc != 0))
+
+        np.clip(x, 0.1, 1e6, out=x)
+        np.log(x, out=x)
+        T = x*x
+        T *= self.c
+        T += self.b
+        T *= x
+        T += self.a
+        np.reciprocal(T, out=T)
+        return T
+
+    def from_codes_array(self, codes, bits, vfs=None):
+        """Calculates temperatures for raw ADC codes, the last axis is the channel.
+           1) Array of ADC codes.
+           2) bits, ADC resolution.
+           3) vfs, ADC full scale voltage, scalar or per channel, defaults to vref.
+        """
+        import numpy as np
+
+        if vfs is None:
+            vfs = self.vref
+
+        vadc = np.asarray(codes, dtype=float) * (np.asarray(vfs, dtype=float) / (1 << bits))
+        return self.from_volts_array(vadc)
+
+
+class Lut(object):
+    """A precomputed ADC code to temperature table for one Circuit setup.
+    The table holds 2**(bits-shift)+1 temperatures, one every 2**shift codes;
+    codes in between are linearly interpolated when shift is nonzero.
+    Use Circuit.build_lut() to create one."""
+
+    def __init__(self, key, bits, shift, table):
+        self.key = key
+        self.bits = int(bits)
+        self.shift = int(shift)
+        self.table = table
+        if self.shift:
+            #per segment slope, prescaled to degrees per code
+            self.slope = (table[1:] - table[:-1]) * (1.0 / (1 << self.shift))
+            self.slope = self.slope.astype(table.dtype)
+
+    @staticmethod
+    def version(circuit, bits, vfs):
+        """Returns the key identifying a table built for this circuit setup"""
+        import hashlib
+
+        params = repr((circuit.values, int(bits), float(vfs)))
+        return hashlib.sha1(params.encode('ascii')).hexdigest()
+
+    def valid_for(self, circuit, vfs=None):
+        """True if the table was built from the current circuit parameters"""
+        if vfs is None:
+            vfs = circuit.vref
+        return self.key == Lut.version(circuit, self.bits, vfs)
+
+    def __call__(self, codes):
+        """Returns the temperatures for an array of ADC codes. Codes outside
+           0..2**bits-1 read as the nearest end of that range."""
+        import numpy as np
+
+        codes = np.clip(np.asarray(codes, dtype=np.intp), 0, (1 << self.bits) - 1)
+        if not self.shift:
+            return self.table[codes]
+
+        idx = codes >> self.shift
+        frac = (codes & ((1 << self.shift) - 1)).astype(self.table.dtype)
+        frac *= self.slope[idx]
+        frac += self.table[idx]
+        return frac
+
+    def save(self, path):
+        """Writes the table to a numpy .npz file"""
+        import numpy as np
+
+        np.savez(path, key=self.key, bits=self.bits, shift=self.shift, table=self.table)
+
+    @classmethod
+    def load(cls, path, circuit=None, vfs=None):
+        """Reads a table written by save(). If a circuit is given, raises
+           ValueError when the table was built for different parameters"""
+        import numpy as np
+
+        with np.load(path) as f:
+            lut = cls(str(f['key']), f['bits'], f['shift'], f['table'])
+
+        if circuit is not None and not lut.valid_for(circuit, vfs):
+            raise ValueError('lookup table does not match the circuit parameters')
+        return lut
+
+
+def _adc_dtype(dtype, bits):
+    """returns the dtype to read bits wide ADC codes stored as dtype: a signed
+       type exactly as wide as the codes is read as its unsigned twin, so
+       16 bit codes in an int16 file are not taken as negative.
+       Raises ValueError if the codes do not fit the type."""
+    import numpy as np
+
+    dtype = np.dtype(dtype)
+    width = dtype.itemsize*8
+    if bits > width:
+        raise ValueError('{} bit codes do not fit {} samples'.format(bits, dtype.name))
+    if dtype.kind == 'i' and bits == width:
+        return np.dtype(dtype.str.replace('i', 'u'))
+    return dtype
+
+
+def convert_file(src, dst, circuit, dtype, bits=None, vfs=None, block=1<<20):
+    """Converts a flat binary capture file to a float32 file of temperatures.
+       Both files are memory mapped and processed block samples at a time,
+       so memory use does not depend on the file size.
+       1) src, input file of raw samples
+       2) dst, output file, created or overwritten, one float32 per sample
+       3) circuit, Circuit used for the conversion
+       4) dtype, numpy dtype of the samples. Integer samples are ADC codes
+          converted through circuit.build_lut(bits, vfs), float samples are volts.
+       5) bits, ADC resolution, needed for integer samples
+       6) vfs, ADC full scale voltage, defaults to circuit.vref
+       Returns the number of samples converted.
+    """
+    import os
+    import numpy as np
+
+    dtype = np.dtype(dtype)
+    if dtype.kind in 'iu':
+        if bits is None:
+            raise ValueError('bits is required for integer ADC samples')
+        _adc_dtype(dtype, bits)
+
+    #numpy cannot map an empty file
+    if os.path.getsize(src) == 0:
+        open(dst, 'wb').close()
+        return 0
+    src = np.memmap(src, dtype=dtype, mode='r')
+    out = np.memmap(dst, dtype=np.float32, mode='w+', shape=src.shape)
+
+    if dtype.kind in 'iu':
+        src = src.view(_adc_dtype(dtype, bits))
+        lut = circuit.build_lut(bits, vfs)
+        for i in range(0, len(src), block):
+            out[i:i+block] = lut(src[i:i+block])
+    else:
+        for i in range(0, len(src), block):
+            out[i:i+block] = circuit.from_volts_array(src[i:i+block])
+
+    out.flush()
+    return len(src)
+
+
+def main(argv=None):
+    """Command line entry point, run python -m ntc_model -h for help"""
+    import argparse
+    import sys
+
+    if argv is None:
+        argv = sys.argv[1:]
+    if not argv:
+        demo()
+        return 0
+
+    parser = argparse.ArgumentParser(prog='ntc_model', description='NTC Thermistor conversions')
+    sub = parser.add_subparsers(dest='command')
+    sub.add_parser('demo', help='print some example conversions (the default)')
+
+    conv = sub.add_parser('convert', help='convert a binary ADC capture file to float32 temperatures (K)')
+    conv.add_argument('src', help='flat binary capture file')
+    conv.add_argument('-o', '--output', help='output file, default src with .temp appended')
+    conv.add_argument('--dtype', default='int16', help='sample type: int16, int32, float32, ... default int16')
+    conv.add_argument('--bits', type=int, help='ADC resolution, required for integer samples')
+    conv.add_argument('--vfs', type=float, help='ADC full scale voltage, default vref')
+    conv.add_argument('--vref', type=float, required=True, help='supply voltage applied to rs')
+    conv.add_argument('--rs', type=float, required=True, help='series resistor, kOhm')
+    conv.add_argument('--rlin', type=float, required=True, help='linearization resistor, kOhm')
+    conv.add_argument('--B', type=float, default=3435, help='thermister B value, default 3435')
+    conv.add_argument('--Rn', type=float, default=10, help='resistance at Tn, kOhm, default 10')
+    conv.add_argument('--Tn', type=float, default=298, help='nominal temperature, K, default 298')
+    conv.add_argument('--block', type=int, default=1<<20, help='samples per block, default 1048576')
+
+    args = parser.parse_args(argv)
+    if args.command == 'convert':
+        import numpy as np
+
+        #argument problems end in a usage message rather than a traceback
+        try:
+            dtype = np.dtype(args.dtype)
+        except TypeError:
+            conv.error('unknown --dtype {}'.format(args.dtype))
+        if dtype.kind in 'iu':
+            if args.bits is None:
+                conv.error('--bits is required for integer --dtype')
+            try:
+                _adc_dtype(dtype, args.bits)
+            except ValueError as e:
+                conv.error(str(e))
+
+        circuit = Circuit(Model(args.B, args.Rn, args.Tn), args.vref, args.rs, args.rlin)
+        dst = args.output or args.src+'.temp'
+        n = convert_file(args.src, dst, circuit, args.dtype, args.bits, args.vfs, args.block)
+        print('{}: {} samples -> {}'.format(args.src, n, dst))
+    else:
+        demo()
+    return 0
+
+
+def demo():
     B = 3435
     Rn = 10 # kOhm
     Tn = 25 # degC
@@ -143,3 +808,8 @@ if __name__ == "__main__":
         t = temperature.from_volts(vadc) - 273
         print(' Vadc:{}V = {} C'.format(vadc, t))
 
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
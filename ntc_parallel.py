@@ -0,0 +1,154 @@
+#Multi core conversion of large capture sets with ntc_model
+#Fell free to modify, improve, hack!
+#Python 3 only: needs concurrent.futures and multiprocessing.shared_memory.
+#Run this file for a scaling benchmark at 1/2/4/8 workers.
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from ntc_model import _adc_dtype
+
+# per worker state, set once by _init
+_circuit = None
+_luts = {}
+
+
+def _init(circuit):
+    """process pool initializer, receives the circuit once per worker"""
+    global _circuit
+    _circuit = circuit
+    _luts.clear()
+
+
+def _attach(name):
+    """attaches to a shared memory block created by the parent"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        #before python 3.13 there is no track flag; the workers share the
+        #parent's resource tracker, so the extra registration is harmless
+        return shared_memory.SharedMemory(name=name)
+
+
+def _open(spec, mode):
+    """returns (array, shared memory or None) for a buffer spec:
+       ('shm', name, dtype, shape) or ('file', path, dtype, shape)"""
+    kind, where, dtype, shape = spec
+    if kind == 'shm':
+        shm = _attach(where)
+        return np.ndarray(shape, dtype=dtype, buffer=shm.buf), shm
+    return np.memmap(where, dtype=dtype, mode=mode, shape=shape), None
+
+
+def _convert_block(src, dst, start, stop, bits, vfs):
+    """converts samples start:stop of src into dst, returns the shared
+       memory blocks to close once the array views are gone"""
+    a, a_shm = _open(src, 'r')
+    out, out_shm = _open(dst, 'r+')
+
+    if a.dtype.kind in 'iu':
+        key = (bits, vfs)
+        if key not in _luts:
+            _luts[key] = _circuit.build_lut(bits, vfs)
+        out[start:stop] = _luts[key](a[start:stop].view(_adc_dtype(a.dtype, bits)))
+    else:
+        out[start:stop] = _circuit.from_volts_array(a[start:stop])
+    if out_shm is None:
+        out.flush()
+
+    return [shm for shm in (a_shm, out_shm) if shm is not None]
+
+
+def _convert(src, dst, start, stop, bits, vfs):
+    """worker task: converts samples start:stop of src into dst"""
+    for shm in _convert_block(src, dst, start, stop, bits, vfs):
+        shm.close()
+    return stop - start
+
+
+def convert_parallel(sources, circuit, workers=None, chunk=1<<20, dtype='int16', bits=None, vfs=None):
+    """Converts a set of captures to float32 temperatures (K) on a process pool.
+       1) sources, list of numpy arrays of any shape and/or paths (str or
+          os.PathLike) of flat binary capture files
+       2) circuit, ntc_model.Circuit, sent once to each worker
+       3) workers, number of processes, default os.cpu_count()
+       4) chunk, samples per task
+       5) dtype, sample type of the capture files
+       6) bits, ADC resolution, needed for integer samples (ADC codes)
+       7) vfs, ADC full scale voltage, defaults to circuit.vref
+       Arrays are copied once into shared memory and their results come back
+       as arrays of the same shape; files are memory mapped by the workers
+       and written to path + '.temp', which is returned in their place, an
+       empty file gives an empty result file. No sample data is pickled.
+    """
+    jobs = []
+    results = []
+    shms = []
+    try:
+        for s in sources:
+            if isinstance(s, (str, os.PathLike)):
+                s = os.fspath(s)
+                dst = s + '.temp'
+                if os.path.getsize(s) == 0:
+                    #an empty file cannot be memory mapped, it has nothing to convert
+                    open(dst, 'wb').close()
+                    jobs.append((('file', s, np.dtype(dtype), (0,)), ('file', dst, np.dtype(np.float32), (0,)), 0))
+                    results.append(dst)
+                    continue
+                a = np.memmap(s, dtype=dtype, mode='r')
+                np.memmap(dst, dtype=np.float32, mode='w+', shape=a.shape).flush()
+                jobs.append((('file', s, a.dtype, a.shape), ('file', dst, np.dtype(np.float32), a.shape), len(a)))
+                results.append(dst)
+                del a
+            else:
+                #workers slice along the first axis, so they get a flat view
+                a = np.ascontiguousarray(s)
+                shape = a.shape
+                a = a.reshape(-1)
+                shm_in = shared_memory.SharedMemory(create=True, size=max(a.nbytes, 1))
+                shm_out = shared_memory.SharedMemory(create=True, size=max(a.size*4, 1))
+                shms += [shm_in, shm_out]
+                np.ndarray(a.shape, dtype=a.dtype, buffer=shm_in.buf)[...] = a
+                jobs.append((('shm', shm_in.name, a.dtype, a.shape), ('shm', shm_out.name, np.dtype(np.float32), a.shape), a.size))
+                results.append((shm_out, shape))
+
+        for src, dst, n in jobs:
+            if src[2].kind in 'iu':
+                if bits is None:
+                    raise ValueError('bits is required for integer ADC samples')
+                _adc_dtype(src[2], bits)
+
+        with ProcessPoolExecutor(workers, initializer=_init, initargs=(circuit,)) as pool:
+            futures = [pool.submit(_convert, src, dst, i, min(i+chunk, n), bits, vfs)
+                       for src, dst, n in jobs for i in range(0, n, chunk)]
+            for f in futures:
+                f.result()
+
+        return [r if isinstance(r, str) else np.ndarray(r[1], dtype=np.float32, buffer=r[0].buf).copy()
+                for r in results]
+    finally:
+        for shm in shms:
+            shm.close()
+            shm.unlink()
+
+
+if __name__ == "__main__":
+    import time
+    from ntc_model import Model, Circuit
+
+    circuit = Circuit(Model(3435, 10, 298), 3.3, 10, 10)
+    codes = np.random.randint(2000, 30000, 4*10**7).astype(np.int16)
+    volts = [np.random.uniform(0.1, 1.5, 10**7) for i in range(4)]
+
+    print('{} cpus'.format(os.cpu_count()))
+    for workers in (1, 2, 4, 8):
+        t = time.time()
+        convert_parallel([codes], circuit, workers, bits=16)
+        tc = time.time()-t
+        t = time.time()
+        convert_parallel(volts, circuit, workers)
+        tv = time.time()-t
+        print(' {} workers: 4e7 int16 codes {:.2f} s, 4e7 float volts {:.2f} s'.format(workers, tc, tv))
@@ -0,0 +1,154 @@
+#asyncio polling of many ADC channels feeding ntc_model conversions
+#Fell free to modify, improve, hack!
+#Python 3 only. One event loop polls every channel: channels sharing a
+#sampling rate are read together, converted in one CircuitBank call and
+#published as a Frame on an asyncio queue. No thread per channel.
+
+import asyncio
+import collections
+import random
+
+from ntc_model import CircuitBank
+
+Frame = collections.namedtuple('Frame', 'time channels temperatures')
+Frame.__doc__ = """One conversion result: loop time of the read, the channel
+numbers and a matching array of temperatures in degrees Kelvin"""
+
+
+class AdcReader(object):
+    """Interface for an async ADC. Subclass it and implement read();
+    override read_many() when the hardware can scan several channels
+    in one transaction."""
+
+    async def read(self, channel):
+        """Returns the voltage measured at one channel"""
+        raise NotImplementedError
+
+    async def read_many(self, channels):
+        """Returns the voltages measured at several channels"""
+        return await asyncio.gather(*[self.read(ch) for ch in channels])
+
+
+class SimulatedReader(AdcReader):
+    """An AdcReader for tests and demos.
+    1) volts, {channel: voltage} or a sequence indexed by channel
+    2) noise, standard deviation of gaussian noise added to each read
+    3) latency, seconds each read takes
+    4) seed, for repeatable noise"""
+
+    def __init__(self, volts, noise=0.0, latency=0.0, seed=None):
+        self.volts = volts
+        self.noise = float(noise)
+        self.latency = float(latency)
+        self.reads = 0
+        self._random = random.Random(seed)
+
+    async def read(self, channel):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.reads += 1
+        v = self.volts[channel]
+        if self.noise:
+            v += self._random.gauss(0, self.noise)
+        return v
+
+
+class Poller(object):
+    """Polls ADC channels at per channel rates and publishes temperatures.
+    1) reader, an AdcReader
+    2) circuits, {channel: ntc_model.Circuit} with closed form ntc models
+    3) rates, {channel: samples per second}, or one rate for every channel
+    4) queue_size, bound of the output queue. When consumers fall behind
+       the oldest frame is dropped and counted in overruns, so the queue
+       never holds stale data for long.
+    Each rate group publishes its own frames on the queue attribute.
+    Create the Poller inside the running event loop and use start()/stop(),
+    or await run() directly."""
+
+    def __init__(self, reader, circuits, rates, queue_size=1024):
+        self.reader = reader
+        self.queue = asyncio.Queue(queue_size)
+        self.overruns = 0
+        self.late = 0
+        self._task = None
+
+        if not isinstance(rates, dict):
+            rates = dict((ch, rates) for ch in circuits)
+
+        #one bank per sampling rate, read and converted together
+        groups = {}
+        for ch in sorted(circuits):
+            groups.setdefault(float(rates[ch]), []).append(ch)
+        self.groups = [(rate, tuple(chs), CircuitBank([circuits[ch] for ch in chs]))
+                       for rate, chs in sorted(groups.items())]
+
+    def _publish(self, frame):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.overruns += 1
+        self.queue.put_nowait(frame)
+
+    async def _poll(self, rate, channels, bank):
+        loop = asyncio.get_running_loop()
+        period = 1.0/rate
+        due = loop.time()
+        while True:
+            t = loop.time()
+            volts = await self.reader.read_many(channels)
+            self._publish(Frame(t, channels, bank.from_volts_array(volts)))
+
+            #fixed schedule, skip missed slots instead of bursting to catch up
+            due += period
+            now = loop.time()
+            if now > due:
+                self.late += 1
+                due += period*((now-due)//period + 1)
+            await asyncio.sleep(due-now)
+
+    async def run(self):
+        """Polls all channel groups until cancelled"""
+        await asyncio.gather(*[self._poll(*group) for group in self.groups])
+
+    def start(self):
+        """Starts polling in the background on the running loop"""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self.run())
+        return self._task
+
+    async def stop(self):
+        """Stops polling"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+if __name__ == "__main__":
+    from ntc_model import Model, Circuit
+
+    async def demo():
+        channels = 256
+        circuits = dict((ch, Circuit(Model(3435, 10, 298), 3.3, 10, 10)) for ch in range(channels))
+        rates = dict((ch, (10, 50, 100)[ch % 3]) for ch in range(channels))
+        reader = SimulatedReader([0.5 + ch/1000.0 for ch in range(channels)], noise=0.002, latency=0.001, seed=1)
+
+        poller = Poller(reader, circuits, rates)
+        poller.start()
+        frames = 0
+        loop = asyncio.get_running_loop()
+        t_end = loop.time() + 2.0
+        lag = 0.0
+        while loop.time() < t_end:
+            frame = await poller.queue.get()
+            lag = max(lag, loop.time() - frame.time)
+            frames += 1
+        await poller.stop()
+
+        print('{} channels, {} frames, {} reads in 2 s'.format(channels, frames, reader.reads))
+        print('worst read-to-consumer latency {:.1f} ms, late slots {}, overruns {}'.format(lag*1000, poller.late, poller.overruns))
+        print('channel 0: {:.2f} C'.format(float(frame.temperatures[0]) - 273))
+
+    asyncio.run(demo())
@@ -3,13 +3,16 @@
 #Note! Temperature range is limited to a range between 1 and 98C
 #OZ1LQO 2014.05.29
 
+import collections
 import math
-from scipy import interpolate
+import sys
+from NTC_spline2 import Spline
+import NTC_registry2
 
 
 #Define resistance vs. temperature arrays for the interpolate function
-#X should always be ascending (apparently not)
-# todo: investigate if ascending/decending returns the same results...
+#Either order is fine, load_table() sorts each table by resistance once
+#and checks that temperature falls as resistance rises.
 
 # from Vishay NTCLE413 Datasheet
 B3435_const = {'resistance' : [0.85833, 0.97426, 1.1092, 1.2667, 1.4513, 1.6684, 1.9246, 2.2280,
@@ -29,20 +32,149 @@ OZ1LQO_const = {'resistance' : [0.94, 1.04, 1.16, 1.32, 1.52, 1.74, 2.03, 2.33,
                           298, 293, 288, 283, 278, 274]
      }
 
-thermisters = { 'B3435': B3435_const, 'OZ1LQO' : OZ1LQO_const}
+# thermister types by name: table dicts, or table files registered by
+# load_directory that are only read when an Ntc first asks for them
+thermisters = NTC_registry2.Catalog({ 'B3435': B3435_const, 'OZ1LQO' : OZ1LQO_const})
+
+# interpolation engine: 'spline' (NTC_spline2, no scipy needed) or 'scipy'
+default_backend = 'spline'
+
+# approximate bytes of materialized tables and interpolators to keep, least
+# recently used types are dropped above it (None keeps everything). Ntc
+# objects keep their own table and interpolators alive either way.
+cache_limit = None
+
+# materialized thermister types, least recently used first:
+# {type: {'table': (resistance, temperature), backend: (RtoT, TtoR), 'bytes': size}}
+_cache = collections.OrderedDict()
+
+
+def _forget(thermister_type):
+    """Drops a thermister type from the cache, thermisters calls it whenever
+    a name is set, replaced or deleted"""
+    _cache.pop(thermister_type, None)
+
+thermisters.on_change = _forget
+
+
+def _sizeof(obj, seen=None):
+    """approximate memory held by a table or interpolator"""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if hasattr(obj, 'nbytes'):
+        return obj.nbytes
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_sizeof(v, seen) for v in obj.values())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(_sizeof(v, seen) for v in obj)
+    elif hasattr(obj, '__dict__'):
+        size += sum(_sizeof(v, seen) for v in vars(obj).values())
+    return size
+
+
+def _entry(thermister_type):
+    """Returns the cache entry of a thermister type, materializing it on first use"""
+
+    try:
+        entry = _cache.pop(thermister_type)
+    except KeyError:
+        source = thermisters.source(thermister_type)
+        if isinstance(source, dict):
+            entry = {'table': NTC_registry2.normalize(thermister_type, source['resistance'], source['temperature'])}
+        else:
+            #a table file, its compiled form already holds the solved splines
+            compiled = thermisters.compiled(thermister_type)
+            entry = {'table': compiled[:2], 'spline': NTC_registry2.splines(compiled)}
+        entry['bytes'] = _sizeof(entry)
+    _cache[thermister_type] = entry
+
+    return entry
+
+
+def _evict():
+    """Drops least recently used types until the cache is under cache_limit"""
+
+    if cache_limit is None:
+        return
+    total = sum(entry['bytes'] for entry in _cache.values())
+    while total > cache_limit and len(_cache) > 1:
+        total -= _cache.popitem(last=False)[1]['bytes']
+
+
+def cache_info():
+    """(materialized types, their approximate bytes, cache_limit)"""
+    return len(_cache), sum(entry['bytes'] for entry in _cache.values()), cache_limit
+
+
+def load_table(thermister_type):
+    """Returns the named table as (resistance, temperature) float lists sorted
+    by ascending resistance, so temperature is strictly descending.
+    Raises ValueError if the table is not a valid NTC curve."""
+
+    table = _entry(thermister_type)['table']
+    _evict()
+
+    return table
+
+
+def interpolators(thermister_type, backend=None):
+    """Returns the cubic (RtoT, TtoR) interpolators for a named table.
+    The splines are fitted on first use and shared by every Ntc of that type"""
+
+    if backend is None:
+        backend = default_backend
+
+    entry = _entry(thermister_type)
+    try:
+        return entry[backend]
+    except KeyError:
+        pass
+
+    #forward index by ascending resistance, inverse by ascending temperature
+    res, temp = entry['table']
+    res_desc, temp_asc = res[::-1], temp[::-1]
+
+    #define the temp and res functions, interpolated between the two arrays. Use cubic approximation
+    if backend == 'spline':
+        pair = (Spline(res, temp), Spline(temp_asc, res_desc))
+    elif backend == 'scipy':
+        from scipy import interpolate
+        pair = (interpolate.interp1d(res, temp, kind='cubic', assume_sorted=True),
+                interpolate.interp1d(temp_asc, res_desc, kind='cubic', assume_sorted=True))
+    else:
+        raise ValueError('unknown interpolation backend: {}'.format(backend))
+    entry[backend] = pair
+    entry['bytes'] += _sizeof(pair)
+    _evict()
+
+    return pair
+
+
+def load_directory(directory):
+    """Adds every CSV/JSON table file in a directory to thermisters, named
+    by file name, see NTC_registry2 for the formats. Files are only read
+    when an Ntc first names them; each table is then compiled once into a
+    binary file next to its source, so later loads skip the parsing and
+    the spline fit. Returns the names of the added tables."""
+
+    return thermisters.add_directory(directory)
 
 
 class Ntc(object):
     """A class to interpolate from NTC Thermistor Temperature vs Resistance tables.
     All temperatures are in degrees Kelvin and all resistance values are in kilo ohms"""
 
-    def __init__(self, thermister_type):
+    def __init__(self, thermister_type, backend=None):
         """initialize the thermister resistance and temperature tables for the selected type
-        including results from own real life measurements of the B3470 Thermistor."""
+        including results from own real life measurements of the B3470 Thermistor.
+        backend selects the interpolation engine, see default_backend."""
 
-        thermister = thermisters[thermister_type]
-        self.therm_res = thermister['resistance']
-        self.therm_temp = thermister['temperature']
+        self.therm_res, self.therm_temp = load_table(thermister_type)
+        self._RtoT, self._TtoR = interpolators(thermister_type, backend)
               
     def __str__(self):
         """Returns the NTC's data"""
@@ -61,39 +193,31 @@ class Ntc(object):
     
     def RtoT(self,R=10):
         """Returns the interpolated temperature from a measured Thermistor resistance
-        Also, only use it within the specifies interval for R, ie. 0.94k->25.5k
+        Also, only use it within the table's interval for R, ie. 0.94k->25.5k for OZ1LQO
         If not, the method will default at R=10"""
         
         #check for valid interval
-        if R>=0.94 and R<=25.5:
-            self.R=float(R)
+        if R>=self.therm_res[0] and R<=self.therm_res[-1]:
+            R=float(R)
         else:
-            self.R=float(10)
+            R=float(10)
             
-        #define the temp function, interpolated between the two arrays. Use cubic approximation
-        #use scipy.interpolate.interp1d for this
-        temp=interpolate.interp1d(self.therm_res, self.therm_temp, kind='cubic')
-        
-        return temp(self.R)
+        return self._RtoT(R)
 
 
     
     def TtoR(self,T=298):
         """Returns the corresponding resistance from a temperature.
-        Also, only use it within the specifies interval for T, ie. 274->371
+        Also, only use it within the table's interval for T, ie. 274->371 for OZ1LQO
         If not, the method will default at T=298"""
 
         #check for valid interval
-        if T>=274 and T<=371:
-            self.T=float(T)
+        if T>=self.therm_temp[-1] and T<=self.therm_temp[0]:
+            T=float(T)
         else:
-            self.T=float(298)
-        
-        #define the temp function, interpolated between the two arrays. Use cubic approximation
-        #use scipy.interpolate.interp1d for this
-        res=interpolate.interp1d(self.therm_temp, self.therm_res, kind='cubic')
+            T=float(298)
         
-        return res(self.T)
+        return self._TtoR(T)
 
 
 
@@ -37,8 +37,8 @@ class Ntc(object):
     def TtoR(self,T=298):
         """Returns the corresponding modeled resistance from a temperature input
            Uses the parameter values given when creating the object: B, Tn, Rn"""
-        self.T=float(T)
-        return self.Rn*math.exp(self.B*((1/self.T)-(1/self.Tn)))
+        T=float(T)
+        return self.Rn*math.exp(self.B*((1/T)-(1/self.Tn)))
 
 
     def RtoT(self,R=10):
@@ -46,13 +46,13 @@ class Ntc(object):
            Uses the parameter values given when creating the object: B, Tn, Rn"""
         #check for gross interval
         if R < 0.1:
-            self.R = 0.1
+            R=0.1
         elif R > 100.0:
-            self.R = 100.0            
+            R=100.0            
         else:
-            self.R=float(R)
+            R=float(R)
         
-        return 1/((math.log(self.R/self.Rn)/self.B)+(1/self.Tn))
+        return 1/((math.log(R/self.Rn)/self.B)+(1/self.Tn))
 
     
     def Rlin(self,T_hi=343,T_lo=298):
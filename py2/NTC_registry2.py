@@ -0,0 +1,251 @@
+#Thermister table files for NTC_interp2
+#Fell free to modify, improve, hack!
+#Reads resistance vs. temperature tables from CSV or JSON files and compiles
+#each one into a small binary file next to its source: the sorted table and
+#the solved spline segments of both directions. The compiled file is keyed
+#by the sha1 of the source, so an edited table is recompiled on next load.
+#
+#CSV: two columns, resistance (kOhm) and temperature (K). An optional header
+#row naming the columns 'resistance' and 'temperature' sets their order.
+#JSON: {"resistance": [...], "temperature": [...]} as in NTC_interp2.
+#The table name is the file name without its extension.
+#
+#Catalog is the lazy name -> table mapping NTC_interp2.thermisters is built
+#on: file tables are only registered by path and read on first use, and
+#every change of a name is reported so caches of it can be dropped.
+
+import hashlib
+import json
+import os
+import struct
+import sys
+from array import array
+
+try:
+    from collections.abc import MutableMapping
+except ImportError:
+    from collections import MutableMapping
+
+from NTC_spline2 import Spline, _not_a_knot
+
+EXTENSIONS = ('.csv', '.json')
+SUFFIX = '.ntcc'
+
+# compiled file: magic, sha1 of the source, point count, then little endian
+# doubles: resistance, temperature, forward and inverse (b, c, d) segments
+_MAGIC = b'NTCC1\n'
+_HEADER = struct.Struct('<6s20sI')
+
+# array byte conversion, named tostring/fromstring before Python 3
+_tobytes = getattr(array, 'tobytes', None) or array.tostring
+_frombytes = getattr(array, 'frombytes', None) or array.fromstring
+
+
+def normalize(name, res, temp):
+    """Returns a table as (resistance, temperature) float lists sorted by
+    ascending resistance, so temperature is strictly descending.
+    Raises ValueError if the table is not a valid NTC curve."""
+
+    if len(res) != len(temp):
+        raise ValueError('{}: resistance and temperature lengths differ'.format(name))
+
+    pts = sorted(zip((float(r) for r in res), (float(t) for t in temp)))
+    for (r0, t0), (r1, t1) in zip(pts, pts[1:]):
+        if not (r1 > r0 and t1 < t0):
+            raise ValueError('{}: table is not strictly monotonic at R={}k'.format(name, r1))
+
+    return [p[0] for p in pts], [p[1] for p in pts]
+
+
+def table_files(directory):
+    """Returns the sorted paths of the table files in a directory"""
+    return sorted(os.path.join(directory, f) for f in os.listdir(directory)
+                  if os.path.splitext(f)[1].lower() in EXTENSIONS)
+
+
+def parse(path, data):
+    """Returns the {'resistance', 'temperature'} table held in the
+    contents (bytes) of a CSV or JSON table file.
+    Raises ValueError naming the file if it holds no usable table."""
+
+    try:
+        text = data.decode('utf-8')
+    except UnicodeDecodeError as e:
+        raise ValueError('{}: not UTF-8 text ({})'.format(path, e))
+
+    if path.lower().endswith('.json'):
+        try:
+            table = json.loads(text)
+        except ValueError as e:
+            raise ValueError('{}: invalid JSON ({})'.format(path, e))
+        try:
+            columns = table['resistance'], table['temperature']
+        except (KeyError, TypeError):
+            raise ValueError('{}: needs "resistance" and "temperature" lists'.format(path))
+        try:
+            return {'resistance': [float(r) for r in columns[0]],
+                    'temperature': [float(t) for t in columns[1]]}
+        except (TypeError, ValueError):
+            raise ValueError('{}: "resistance" and "temperature" must be lists of numbers'.format(path))
+
+    rows = [[v.strip() for v in line.split(',')] for line in text.splitlines()
+            if line.strip() and not line.lstrip().startswith('#')]
+    if not rows:
+        raise ValueError('{}: no table rows'.format(path))
+    cols = (0, 1)
+    try:
+        float(rows[0][0])
+    except ValueError:
+        header = [v.lower() for v in rows.pop(0)]
+        if 'resistance' not in header or 'temperature' not in header:
+            raise ValueError("{}: header needs 'resistance' and 'temperature' columns, got {}"
+                             .format(path, ', '.join(header)))
+        cols = (header.index('resistance'), header.index('temperature'))
+        if not rows:
+            raise ValueError('{}: no table rows after the header'.format(path))
+
+    table = {'resistance': [], 'temperature': []}
+    for row in rows:
+        try:
+            r, t = float(row[cols[0]]), float(row[cols[1]])
+        except (IndexError, ValueError):
+            raise ValueError('{}: bad table row {}'.format(path, ','.join(row)))
+        table['resistance'].append(r)
+        table['temperature'].append(t)
+    return table
+
+
+def compile_table(name, table):
+    """Returns the compiled form of a table: (resistance, temperature,
+    forward segments, inverse segments), resistance ascending"""
+
+    res, temp = normalize(name, table['resistance'], table['temperature'])
+    if len(res) < 4:
+        raise ValueError('{}: a cubic spline needs at least 4 points'.format(name))
+    return res, temp, _not_a_knot(res, temp), _not_a_knot(temp[::-1], res[::-1])
+
+
+def splines(compiled):
+    """Returns the (RtoT, TtoR) splines of a compiled table"""
+    res, temp, forward, inverse = compiled
+    return Spline.from_coef(res, temp, forward), Spline.from_coef(temp[::-1], res[::-1], inverse)
+
+
+def _dump(digest, compiled):
+    res, temp, forward, inverse = compiled
+    values = array('d', res + temp)
+    for segments in (forward, inverse):
+        for segment in segments:
+            values.extend(segment)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return _HEADER.pack(_MAGIC, digest, len(res)) + _tobytes(values)
+
+
+def _load(digest, data):
+    """the compiled table in data, None if it is stale or not compiled"""
+    if len(data) < _HEADER.size:
+        return None
+    magic, key, n = _HEADER.unpack_from(data)
+    if magic != _MAGIC or key != digest or len(data) != _HEADER.size + 8*(2*n + 6*(n-1)):
+        return None
+
+    values = array('d')
+    _frombytes(values, data[_HEADER.size:])
+    if sys.byteorder != 'little':
+        values.byteswap()
+
+    values = values.tolist()
+    m = 2*n + 3*(n-1)
+    forward, inverse = values[2*n:m], values[m:]
+    return (values[:n], values[n:2*n],
+            [tuple(forward[i:i+3]) for i in range(0, len(forward), 3)],
+            [tuple(inverse[i:i+3]) for i in range(0, len(inverse), 3)])
+
+
+def load(path):
+    """Returns (name, compiled table) for a table file. The compiled form is
+    read from path + SUFFIX when it matches the source, otherwise it is built
+    and written there; an unwritable directory only costs the rebuild."""
+
+    name = os.path.splitext(os.path.basename(path))[0]
+    with open(path, 'rb') as f:
+        data = f.read()
+    digest = hashlib.sha1(data).digest()
+
+    cache = path + SUFFIX
+    try:
+        with open(cache, 'rb') as f:
+            compiled = _load(digest, f.read())
+    except (IOError, OSError):
+        compiled = None
+    if compiled is not None:
+        return name, compiled
+
+    compiled = compile_table(name, parse(path, data))
+    try:
+        with open(cache, 'wb') as f:
+            f.write(_dump(digest, compiled))
+    except (IOError, OSError):
+        pass
+    return name, compiled
+
+
+class Catalog(MutableMapping):
+    """A mapping of thermister names to tables that reads table files lazily.
+    Values are set as a table dict or as the path of a table file; reading
+    an item returns the table dict, parsing (or loading the compiled form
+    of) a file only then. Nothing read is kept here, callers cache what
+    they use and set on_change, called with the name whenever a name is
+    set, replaced or deleted, to drop their cached copy."""
+
+    def __init__(self, tables=None, on_change=None):
+        self._sources = dict(tables or {})
+        self.on_change = on_change
+
+    def _changed(self, name):
+        if self.on_change is not None:
+            self.on_change(name)
+
+    def __getitem__(self, name):
+        source = self._sources[name]
+        if isinstance(source, dict):
+            return source
+        res, temp = load(source)[1][:2]
+        return {'resistance': res, 'temperature': temp}
+
+    def __setitem__(self, name, source):
+        self._sources[name] = source
+        self._changed(name)
+
+    def __delitem__(self, name):
+        del self._sources[name]
+        self._changed(name)
+
+    def __iter__(self):
+        return iter(self._sources)
+
+    def __len__(self):
+        return len(self._sources)
+
+    def source(self, name):
+        """Returns the table dict or file path registered under name"""
+        return self._sources[name]
+
+    def add_directory(self, directory):
+        """Registers every table file in a directory by file name without
+        reading them. Returns the registered names."""
+        names = []
+        for path in table_files(directory):
+            name = os.path.splitext(os.path.basename(path))[0]
+            self._sources[name] = path
+            self._changed(name)
+            names.append(name)
+        return names
+
+    def compiled(self, name):
+        """Returns the compiled form of a table, see compile_table"""
+        source = self._sources[name]
+        if isinstance(source, dict):
+            return compile_table(name, source)
+        return load(source)[1]
@@ -0,0 +1,117 @@
+#Cubic spline interpolation for the NTC Thermistor tables
+#Fell free to modify, improve, hack!
+#A small stand in for scipy.interpolate.interp1d(kind='cubic') so
+#interpolated thermisters do not need scipy installed.
+
+from bisect import bisect_right
+
+
+class Spline(object):
+    """A not-a-knot cubic spline through a table of points, the same curve
+    scipy.interpolate.interp1d(x, y, kind='cubic') returns.
+    The coefficients are computed once, each call is a bisect and a
+    third order polynomial. Values outside of the table raise ValueError."""
+
+    def __init__(self, x, y):
+        """initialize the spline from two equal length sequences,
+        x does not need to be sorted but must not repeat"""
+
+        if len(x) != len(y):
+            raise ValueError('x and y must have the same length')
+        if len(x) < 4:
+            raise ValueError('a cubic spline needs at least 4 points')
+
+        pts = sorted(zip((float(v) for v in x), (float(v) for v in y)))
+        self.x = [p[0] for p in pts]
+        self.y = [p[1] for p in pts]
+        for i in range(1, len(self.x)):
+            if self.x[i] == self.x[i-1]:
+                raise ValueError('x values must be unique')
+
+        self.coef = _not_a_knot(self.x, self.y)
+
+    @classmethod
+    def from_coef(cls, x, y, coef):
+        """Returns a spline from already solved segments, as kept in
+        spline.x, spline.y and spline.coef, without refitting.
+        x must be ascending and coef hold one (b, c, d) per segment"""
+
+        spline = cls.__new__(cls)
+        spline.x = [float(v) for v in x]
+        spline.y = [float(v) for v in y]
+        spline.coef = [tuple(c) for c in coef]
+        return spline
+
+    def __call__(self, x):
+        """Returns the interpolated value at x"""
+
+        x = float(x)
+        if not (self.x[0] <= x <= self.x[-1]):
+            raise ValueError('{} is outside the interpolation range {}..{}'.format(x, self.x[0], self.x[-1]))
+
+        i = min(bisect_right(self.x, x), len(self.x)-1) - 1
+        t = x - self.x[i]
+        b, c, d = self.coef[i]
+        return self.y[i] + t*(b + t*(c + t*d))
+
+    def array(self, x):
+        """Returns the interpolated values for an array of x.
+        Requires numpy."""
+        import numpy as np
+
+        if not hasattr(self, '_np'):
+            self._np = (np.array(self.x), np.array(self.y), np.array(self.coef).T)
+        xs, ys, (b, c, d) = self._np
+
+        x = np.asarray(x, dtype=float)
+        if np.any(x < xs[0]) or np.any(x > xs[-1]):
+            raise ValueError('a value is outside the interpolation range {}..{}'.format(xs[0], xs[-1]))
+
+        i = np.clip(np.searchsorted(xs, x, side='right'), 1, len(xs)-1) - 1
+        t = x - xs[i]
+        return ys[i] + t*(b[i] + t*(c[i] + t*d[i]))
+
+
+def _not_a_knot(x, y):
+    """Returns the (b, c, d) polynomial coefficients of each segment of the
+    not-a-knot cubic spline through the points x, y (x ascending)"""
+
+    n = len(x)
+    h = [x[i+1]-x[i] for i in range(n-1)]
+    s = [(y[i+1]-y[i])/h[i] for i in range(n-1)]
+
+    #tridiagonal system for the second derivatives m at the interior points:
+    #lower[i]*m[i-1] + diag[i]*m[i] + upper[i]*m[i+1] = rhs[i]
+    lower = [0.0]*n
+    diag = [0.0]*n
+    upper = [0.0]*n
+    rhs = [0.0]*n
+    for i in range(1, n-1):
+        lower[i] = h[i-1]
+        diag[i] = 2*(h[i-1]+h[i])
+        upper[i] = h[i]
+        rhs[i] = 6*(s[i]-s[i-1])
+
+    #not-a-knot: the third derivative is continuous at x[1] and x[n-2],
+    #  h1*m0 - (h0+h1)*m1 + h0*m2 = 0
+    #and the mirror image at the other end. Substitute m0 and m[n-1] out of
+    #the first and last interior rows and solve for m[1]..m[n-2].
+    diag[1] += h[0]*(h[0]+h[1])/h[1]
+    upper[1] -= h[0]*h[0]/h[1]
+    diag[n-2] += h[-1]*(h[-2]+h[-1])/h[-2]
+    lower[n-2] -= h[-1]*h[-1]/h[-2]
+
+    #thomas algorithm
+    for i in range(2, n-1):
+        w = lower[i]/diag[i-1]
+        diag[i] -= w*upper[i-1]
+        rhs[i] -= w*rhs[i-1]
+    m = [0.0]*n
+    m[n-2] = rhs[n-2]/diag[n-2]
+    for i in range(n-3, 0, -1):
+        m[i] = (rhs[i]-upper[i]*m[i+1])/diag[i]
+    m[0] = ((h[0]+h[1])*m[1] - h[0]*m[2])/h[1]
+    m[n-1] = ((h[-2]+h[-1])*m[n-2] - h[-1]*m[n-3])/h[-2]
+
+    return [(s[i] - h[i]*(2*m[i]+m[i+1])/6, m[i]/2, (m[i+1]-m[i])/(6*h[i]))
+            for i in range(n-1)]
@@ -1,7 +1,7 @@
 #Class to work with NTC Thermistors in Python 3
 #Fell free to modify, improve, hack!
 #Note! Temperature range is limited to a range between 1 and 98C
-#Requires scipy
+#Uses scipy only if selected as interpolation backend
 #OZ1LQO 2014.05.29
 
 """
@@ -20,7 +20,38 @@
     """
 
 import math
-from scipy import interpolate
+from NTC_spline_py3 import Spline
+
+
+#Measured B3470 resistance vs. temperature table for the *_meas methods
+meas_res=[0.94, 1.04, 1.16, 1.32, 1.52, 1.74, 2.03, 2.33, 2.71, 3.16, 3.73, 4.43, 5.2,
+          6.2, 7.5, 9.8, 11.28, 13.5, 16.15, 18.5, 25.5]
+meas_temp=[371, 368, 363, 358, 353, 348, 343, 338, 333, 328, 323, 318, 313, 308, 303,
+           298, 293, 288, 283, 278, 274]
+
+#interpolation engine: 'spline' (NTC_spline_py3, no scipy needed) or 'scipy'
+interp_backend='spline'
+
+#(RtoT, TtoR) interpolators per backend, fitted once on first use
+_meas_interp={}
+
+def meas_interpolators():
+    """Returns the cubic (RtoT, TtoR) interpolators for the measured table"""
+    try:
+        return _meas_interp[interp_backend]
+    except KeyError:
+        pass
+
+    if interp_backend=='spline':
+        pair=(Spline(meas_res,meas_temp), Spline(meas_temp,meas_res))
+    elif interp_backend=='scipy':
+        from scipy import interpolate
+        pair=(interpolate.interp1d(meas_res,meas_temp,kind='cubic'),
+              interpolate.interp1d(meas_temp,meas_res,kind='cubic'))
+    else:
+        raise ValueError('unknown interpolation backend: {}'.format(interp_backend))
+    _meas_interp[interp_backend]=pair
+    return pair
 
 
 
@@ -63,22 +94,13 @@ class Ntc(object):
         If not, the method will default at R=10"""
         
         #check for valid interval
-        if R>=0.94 and R<=25.5:
-            self.R=R
-        else:
-            self.R=10
+        if not (R>=0.94 and R<=25.5):
+            R=10
             
-        #Define resistance vs. temperature arrays for the interpolate function
-        #X should always be ascending
-        res_x=[0.94, 1.04, 1.16, 1.32, 1.52, 1.74, 2.03, 2.33, 2.71, 3.16, 3.73, 4.43, 5.2,
-               6.2, 7.5, 9.8, 11.28, 13.5, 16.15, 18.5, 25.5]
-        temp_y=[371, 368, 363, 358, 353, 348, 343, 338, 333, 328, 323, 318, 313, 308, 303,
-                298, 293, 288, 283, 278, 274]
-        #define the temp function, interpolated between the two arrays. Use cubic approximation
-        #use scipy.interpolate.interp1d for this
-        temp=interpolate.interp1d(res_x,temp_y,kind='cubic')
+        #the temp function, interpolated between the two arrays. Use cubic approximation
+        temp=meas_interpolators()[0]
         
-        return temp(self.R)
+        return temp(R)
 
 
     
@@ -89,41 +111,29 @@ class Ntc(object):
         If not, the method will default at T=298"""
 
         #check for valid interval
-        if T>=274 and T<=371:
-            self.T=T
-        else:
-            self.T=298
+        if not (T>=274 and T<=371):
+            T=298
         
-        #Define temperature vs. resistance arrays for the interpolate function
-        #X should always be ascending
-        temp_x=[274, 278, 283, 288, 293, 298, 303, 308, 313, 318, 323, 328, 333, 338, 343,
-        348, 353, 358, 363, 368, 371]
-        res_y=[25.5, 18.5, 16.15, 13.5, 11.28, 9.8, 7.5, 6.2, 5.2, 4.43, 3.73, 3.16, 2.71,
-               2.33, 2.03, 1.74, 1.52, 1.32, 1.16, 1.04, 0.94]
-        #define the temp function, interpolated between the two arrays. Use cubic approximation
-        #use scipy.interpolate.interp1d for this
-        res=interpolate.interp1d(temp_x,res_y,kind='cubic')
+        #the res function, interpolated between the two arrays. Use cubic approximation
+        res=meas_interpolators()[1]
         
-        return res(self.T)
+        return res(T)
 
 
 
     def TtoR_calc(self,T=298):
         """Returns the corresponding modeled resistance from a temperature input
            Uses the parameter values given when creating the object: B, Tn, Rn"""
-        self.T=T
-        return self.Rn*math.exp(self.B*((1/self.T)-(1/self.Tn)))
+        return self.Rn*math.exp(self.B*((1/T)-(1/self.Tn)))
 
 
     def RtoT_calc(self,R=10):
         """Returns the corresponding modeled temperature from a resistance input
            Uses the parameter values given when creating the object: B, Tn, Rn"""
         #check for valid interval
-        if R>=0.94 and R<=25.5:
-            self.R=R
-        else:
-            self.R=10
-        return 1/((math.log(self.R/self.Rn)/self.B)+(1/self.Tn))
+        if not (R>=0.94 and R<=25.5):
+            R=10
+        return 1/((math.log(R/self.Rn)/self.B)+(1/self.Tn))
 
     
     def Rlin(self,T_hi=343,T_lo=298):